@@ -22,11 +22,10 @@ using a parameterized chunking mechanism.
 # installation support files
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
-import time
 from os import path
 
 # splunk support files
-from splunklib.binding import connect
+from splunklib.binding import connect, RetryPolicy
 try:
     from utils import parse
 except ImportError:
@@ -283,26 +282,18 @@ def export(options, service):
     if (end != ""):
         squery = squery + " latest_time=%s" % end
 
-    success = False
-
-    while not success:
-        # issue query to splunkd
-        # count=0 overrides the maximum number of events
-        # returned (normally 50K) regardless of what the .conf
-        # file for splunkd says. 
-        result = service.get('search/jobs/export', 
-                             search=squery, 
-                             output_mode=options.kwargs['omode'],
-                             timeout=60,
-                             earliest_time="0.000",
-                             time_format="%s.%Q",
-                             count=0)
-
-        if result.status != 200:
-            print "warning: export job failed: %d, sleep/retry" % result.status
-            time.sleep(60)
-        else:
-            success = True
+    # issue query to splunkd; failed attempts are retried by the
+    # service's retry policy.
+    # count=0 overrides the maximum number of events
+    # returned (normally 50K) regardless of what the .conf
+    # file for splunkd says. 
+    result = service.get('search/jobs/export', 
+                         search=squery, 
+                         output_mode=options.kwargs['omode'],
+                         timeout=60,
+                         earliest_time="0.000",
+                         time_format="%s.%Q",
+                         count=0)
 
     # write export file 
     while True:
@@ -325,7 +316,8 @@ def main():
               options.kwargs['omode'])
         sys.exit(1)
 
-    service = connect(**options.kwargs)
+    retry = RetryPolicy(retries=10, backoff=1, max_backoff=60)
+    service = connect(retry=retry, **options.kwargs)
 
     if path.exists(options.kwargs['output']):
         if options.kwargs['recover'] == False:
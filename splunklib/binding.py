@@ -24,30 +24,60 @@ If you want a friendlier interface to the Splunk REST API, use the
 :mod:`splunklib.client` module.
 """
 
+import binascii
+import collections
+import errno
+import hashlib
+import hmac
 import httplib
 import logging
 import socket
 import ssl
 import urllib
 import io
+import json
+import math
+import os
+import Queue
+import random
+import re
 import sys
+import threading
+import time
+import zlib
 
-from datetime import datetime
+from email.utils import mktime_tz, parsedate_tz
 from functools import wraps
 from StringIO import StringIO
+from xml.sax.saxutils import unescape
 
 from contextlib import contextmanager
 
-from xml.etree.ElementTree import XML
+try:
+    from collections import OrderedDict
+except ImportError: # Python 2.6
+    from ordereddict import OrderedDict
+
+try:
+    import fcntl
+except ImportError: # Windows, where the token cache is not locked.
+    fcntl = None
 
 from data import record
+import etree
 
 __all__ = [
     "AuthenticationError",
+    "CircuitOpenError",
     "connect",
     "Context",
     "handler",
-    "HTTPError"
+    "HTTPError",
+    "RateLimiter",
+    "RequestStats",
+    "ResponseCache",
+    "RetryPolicy",
+    "TokenCache"
 ]
 
 # If you change these, update the docstring
@@ -55,17 +85,7 @@ __all__ = [
 DEFAULT_HOST = "localhost"
 DEFAULT_PORT = "8089"
 DEFAULT_SCHEME = "https"
-
-def _log_duration(f):
-    @wraps(f)
-    def new_f(*args, **kwargs):
-        start_time = datetime.now()
-        val = f(*args, **kwargs)
-        end_time = datetime.now()
-        logging.debug("Operation took %s", end_time-start_time)
-        return val
-    return new_f
-
+DEFAULT_TOKEN_CACHE = "~/.splunktokens"
 
 # Singleton values to eschew None
 class _NoAuthenticationToken(object):
@@ -201,7 +221,8 @@ def _authentication(request_fun):
     ``AuthenticationError`` if an ``HTTPError`` of status 401 is
     raised in *request_fun*. If it's ``True``, then
     ``_authentication`` will try at all sensible places to
-    log in before issuing the request.
+    log in before issuing the request. A ``Context`` with a token cache
+    also logs in again after a 401, since the cached token may have expired.
 
     If ``autologin`` is ``False``, ``_authentication`` makes
     one roundtrip to the server if the ``Context`` is logged in,
@@ -224,12 +245,13 @@ def _authentication(request_fun):
     """
     @wraps(request_fun)
     def wrapper(self, *args, **kwargs):
-        if self.token is _NoAuthenticationToken:
+        token = self.token
+        if token is _NoAuthenticationToken:
             # Not yet logged in.
             if self.autologin and self.username and self.password:
                 # This will throw an uncaught
                 # AuthenticationError if it fails.
-                self.login()
+                token = self._relogin(token)
             else:
                 # Try the request anyway without authentication.
                 # Most requests will fail. Some will succeed, such as
@@ -240,17 +262,18 @@ def _authentication(request_fun):
             # Issue the request
             return request_fun(self, *args, **kwargs)
         except HTTPError as he:
-            if he.status == 401 and self.autologin:
+            if he.status == 401 and \
+                    (self.autologin or self._token_cache is not None):
                 # Authentication failed. Try logging in, and then
                 # rerunning the request. If either step fails, throw
                 # an AuthenticationError and give up.
                 with _handle_auth_error("Autologin failed."):
-                    self.login()
+                    self._relogin(token)
                 with _handle_auth_error(
                         "Autologin succeeded, but there was an auth error on "
                         "next request. Something is very wrong."):
                     return request_fun(self, *args, **kwargs)
-            elif he.status == 401 and not self.autologin:
+            elif he.status == 401:
                 raise AuthenticationError(
                     "Request failed: Session is not logged in.", he)
             else:
@@ -303,6 +326,366 @@ def _authority(scheme=DEFAULT_SCHEME, host=DEFAULT_HOST, port=DEFAULT_PORT):
         host = '[' + host + ']'
     return UrlEncoded("%s://%s:%s" % (scheme, host, port), skip_encode=True)
 
+def _endpoint(endpoint, port=DEFAULT_PORT):
+    """Splits one entry of the *hosts* argument of :class:`Context` into a
+    host and a port.
+
+    *endpoint* is a ``(host, port)`` tuple, a ``"host:port"`` string, or a
+    bare host name, which gets *port*. IPv6 addresses with a port must be
+    enclosed in brackets, as in URLs.
+
+    **Example**::
+
+        _endpoint("sh1.utopia.net") == ("sh1.utopia.net", 8089)
+        _endpoint("sh1.utopia.net:8090") == ("sh1.utopia.net", 8090)
+        _endpoint("[::1]:8090") == ("::1", 8090)
+        _endpoint(("sh1.utopia.net", "8090")) == ("sh1.utopia.net", 8090)
+    """
+    if isinstance(endpoint, tuple):
+        host, port = endpoint
+    elif endpoint.startswith('[') and ']:' in endpoint:
+        host, port = endpoint[1:].split(']:', 1)
+    elif endpoint.count(':') == 1:
+        host, port = endpoint.split(':')
+    else:
+        host = endpoint.strip('[]')
+    return host, int(port)
+
+class _Member(object):
+    """One splunkd instance behind a :class:`Context`, with its own session
+    token."""
+    def __init__(self, scheme, host, port, token):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.token = token
+        self.outstanding = 0
+        self.down_until = None
+
+    @property
+    def authority(self):
+        return _authority(self.scheme, self.host, self.port)
+
+class _Balancer(object):
+    """Picks the member of a :class:`Context` that serves each request.
+
+    Reads are spread over the members that are up, either in turn
+    (``"round_robin"``) or to the one with the fewest requests in flight
+    (``"least_outstanding"``). Writes go to the first member that is up.
+    Requests under a path that has been pinned to a member, such as the
+    endpoints of a search job that the member created, go to that member
+    while it is up. A member that fails is skipped for *interval* seconds,
+    after which the next request it is chosen for probes it again.
+    """
+    def __init__(self, members, strategy="round_robin", interval=30):
+        if strategy not in ("round_robin", "least_outstanding"):
+            raise ValueError("Unknown balancing strategy: %s" % strategy)
+        self.members = members
+        self.strategy = strategy
+        self.interval = interval
+        self._next = 0
+        self._lock = threading.Lock()
+        # Pinned paths, and the order they were pinned in, oldest first.
+        self._pinned = {}
+        self._pin_order = collections.deque()
+
+    def pin(self, path, member):
+        """Sends the requests to *path* and the paths under it to *member*.
+        Only the last ``_MAX_PINNED`` paths are remembered."""
+        with self._lock:
+            if path not in self._pinned:
+                self._pin_order.append(path)
+                if len(self._pin_order) > _MAX_PINNED:
+                    self._pinned.pop(self._pin_order.popleft(), None)
+            self._pinned[path] = member
+
+    def unpin(self, path):
+        """Forgets *path*, for example after deleting the entity there."""
+        with self._lock:
+            if self._pinned.pop(path, None) is not None:
+                self._pin_order.remove(path)
+
+    def _pinned_member(self, path):
+        segments = path.split("/")
+        for size in range(len(segments), 0, -1):
+            member = self._pinned.get("/".join(segments[:size]))
+            if member is not None:
+                return member
+        return None
+
+    def choose(self, read, tried=(), path=None):
+        """Returns the member to send a request to next, or ``None`` when all
+        members are in *tried*. *path* is the endpoint path of the request,
+        without its namespace."""
+        with self._lock:
+            now = time.time()
+            untried = [m for m in self.members if m not in tried]
+            if not untried:
+                return None
+            up = [m for m in untried
+                  if m.down_until is None or m.down_until <= now]
+            pinned = None if path is None else self._pinned_member(path)
+            if pinned in up:
+                member = pinned
+            elif not up:
+                # Everything is down; try the member that went down first.
+                member = min(untried, key=lambda m: m.down_until)
+            elif not read:
+                member = up[0]
+            elif self.strategy == "round_robin":
+                member = up[self._next % len(up)]
+                self._next += 1
+            else:
+                member = min(up, key=lambda m: m.outstanding)
+            member.outstanding += 1
+            return member
+
+    def release(self, member, failed):
+        """Records the end of a request sent to *member*."""
+        with self._lock:
+            member.outstanding -= 1
+            self.mark(member, not failed)
+
+    def mark(self, member, up):
+        if up:
+            member.down_until = None
+        elif member.down_until is None or member.down_until <= time.time():
+            member.down_until = time.time() + self.interval
+
+# The number of paths that a _Balancer keeps pinned to members.
+_MAX_PINNED = 10000
+
+# The number of characters of the response to a write that are searched for
+# the search job or entity it created.
+_CREATED_PEEK_SIZE = 8192
+
+# The search job that a write created, in XML and JSON responses.
+_CREATED_SID = re.compile(r'<sid>\s*([^<\s]+)\s*</sid>|"sid"\s*:\s*"([^"]+)"')
+
+# The entity that a write created, as the name of the first entry of an
+# Atom feed or of a JSON response.
+_CREATED_ENTRY = re.compile(
+    r'<entry\b.*?<title>([^<]*)</title>|"entry"\s*:\s*\[\s*\{\s*"name"\s*:\s*"([^"]*)"',
+    re.DOTALL)
+
+def _routing_path(path_segment):
+    """Returns the endpoint path of a request, without its namespace, query,
+    or URL encoding, as used to pin paths to members."""
+    path = urllib.unquote(str(path_segment).split('?', 1)[0])
+    return _endpoint_path(path).strip('/')
+
+def _created(path, response):
+    """Returns the paths of the search job and of the entity that a write to
+    *path* created, found at the start of its *response*.
+
+    The body of *response* is wrapped in a :class:`ResponseReader` if it
+    isn't one, and is only peeked at.
+    """
+    if not isinstance(response.body, ResponseReader):
+        response['body'] = ResponseReader(response.body)
+    text = response.body.peek(_CREATED_PEEK_SIZE)
+    paths = []
+    match = _CREATED_SID.search(text)
+    if match is not None:
+        paths.append("search/jobs/" + (match.group(1) or match.group(2)))
+    match = _CREATED_ENTRY.search(text) if response.status == 201 else None
+    if match is not None:
+        name = unescape(match.group(1)) if match.group(1) is not None \
+            else match.group(2)
+        if path.rsplit('/', 1)[-1] != name:
+            paths.append(path + '/' + name)
+    return paths
+
+# Connection errors after which a request has certainly not reached splunkd.
+_UNREACHABLE_ERRNOS = (errno.ECONNREFUSED, errno.EHOSTUNREACH,
+                       errno.ENETUNREACH)
+
+def _unavailable(error, read):
+    """Returns whether *error* shows that a member is unavailable and the
+    request can be sent to another one.
+
+    Reads fail over on any connection error or gateway error status, but a
+    write only does when it cannot have reached the server.
+    """
+    if isinstance(error, CircuitOpenError):
+        return True
+    if isinstance(error, socket.error) and \
+            getattr(error, "errno", None) in _UNREACHABLE_ERRNOS:
+        return True
+    if not read:
+        return False
+    if isinstance(error, HTTPError):
+        return error.status in (502, 503, 504)
+    return isinstance(error, (socket.error, httplib.HTTPException))
+
+def _routed(request_fun):
+    """Decorator to send a ``Context`` method to one of its members, and to
+    fail over to the others.
+
+    *request_fun* runs with the chosen member as the current member of the
+    ``Context`` in this thread, so its ``authority`` and ``token`` are the
+    member's. If *request_fun* fails because the member is unavailable, it is
+    run again on another member, until every member has been tried. A member
+    that was never logged in is logged in first if the ``Context`` has been,
+    unless *request_fun* is the login itself.
+
+    A ``POST`` that creates a search job or an entity pins the path of the job
+    or entity to the member that handled it, so that the requests that follow
+    go to the member that has it. A ``DELETE`` forgets the path.
+
+    With a single host, *request_fun* is called directly.
+    """
+    @wraps(request_fun)
+    def wrapper(self, *args, **kwargs):
+        if len(self._members) == 1 or self._current is not None:
+            return request_fun(self, *args, **kwargs)
+        if request_fun.__name__ == "request":
+            method = kwargs.get("method", args[1] if len(args) > 1 else "GET")
+        else:
+            method = request_fun.__name__.upper()
+        read = method in ("GET", "HEAD")
+        path = _routing_path(args[0] if args else kwargs.get("path_segment", ""))
+        tried = []
+        while True:
+            member = self._balancer.choose(read, tried, path)
+            tried.append(member)
+            self._local.member = member
+            failed = False
+            try:
+                if member.token is _NoAuthenticationToken and \
+                        request_fun.__name__ != "login" and \
+                        self._logged_in and self.username and self.password:
+                    self._relogin(_NoAuthenticationToken)
+                response = request_fun(self, *args, **kwargs)
+                if method == "DELETE":
+                    self._balancer.unpin(path)
+                elif method == "POST":
+                    for created in _created(path, response):
+                        self._balancer.pin(created, member)
+                return response
+            except Exception as e:
+                failed = _unavailable(e, True)
+                if not _unavailable(e, read) or len(tried) == len(self._members):
+                    raise
+                logging.warning("%s:%s is unavailable (%s), failing over.",
+                                member.host, member.port, e)
+            finally:
+                self._local.member = None
+                self._balancer.release(member, failed)
+
+    return wrapper
+
+class _SingleFlight(object):
+    """Shares one in-flight request among the threads that make it at the
+    same time.
+
+    The first thread to call :meth:`do` with a key runs the request and reads
+    its body; threads that call :meth:`do` with the same key before it
+    finishes wait for it instead of sending their own request. Every caller
+    gets its own response, with a reader over its own copy of the body, or
+    the error raised by the request. Once the request finishes, the next call
+    with the key sends a new one.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, request):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = record({
+                    'done': threading.Event(), 'response': None,
+                    'body': None, 'error': None})
+        if leader:
+            try:
+                call.response = request()
+                call.body = call.response.body.read()
+            except:
+                call.error = sys.exc_info()
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error[0], call.error[1], call.error[2]
+        return record(dict(call.response,
+                           body=ResponseReader(StringIO(call.body))))
+
+def _pooled(function, items, max_workers, ordered=True, lookahead=None):
+    """Calls ``function(index, item)`` for each of *items* from up to
+    *max_workers* threads, and returns an iterator over the return values,
+    in the order of *items* if *ordered* is true, or else as they are done.
+
+    The threads are started when the caller first asks for a value. At most
+    *lookahead* items (if given) are being worked on or waiting to be taken
+    by the caller. An exception raised by *function* is raised by the
+    iterator in place of the value, and ends the iteration. Once the
+    iteration ends, or the caller closes or drops the iterator, no more items
+    are started and the threads exit as soon as their current item is done.
+    """
+    assert lookahead is None or lookahead > 0
+    items = list(items)
+    pending = Queue.Queue()
+    for item in enumerate(items):
+        pending.put(item)
+    results = Queue.Queue()
+    stopped = []
+    workers = min(max_workers, len(items))
+    # Items are taken in order, so with ordered results the one the caller
+    # waits for is always among those taken.
+    slots = threading.Semaphore(lookahead) if lookahead else None
+
+    def work():
+        while not stopped:
+            if slots is not None:
+                slots.acquire()
+                if stopped: return
+            try:
+                index, item = pending.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results.put((index, function(index, item), None))
+            except Exception:
+                results.put((index, None, sys.exc_info()))
+
+    def taken(result):
+        if slots is not None: slots.release()
+        index, value, error = result
+        if error is not None:
+            raise error[0], error[1], error[2]
+        return value
+
+    def collect():
+        try:
+            for _ in range(workers):
+                thread = threading.Thread(target=work)
+                thread.daemon = True
+                thread.start()
+            done = {}
+            next_index = 0
+            for _ in range(len(items)):
+                result = results.get()
+                if not ordered:
+                    yield taken(result)
+                    continue
+                done[result[0]] = result
+                while next_index in done:
+                    yield taken(done.pop(next_index))
+                    next_index += 1
+        finally:
+            # Runs when the iteration ends, and when the generator is closed
+            # or collected, so that no worker waits for a slot forever.
+            stopped.append(True)
+            if slots is not None:
+                for _ in range(workers): slots.release()
+
+    return collect()
+
 # kwargs: sharing, owner, app
 def namespace(sharing=None, owner=None, app=None, **kwargs):
     """This function constructs a Splunk namespace.
@@ -383,6 +766,27 @@ class Context(object):
     :type port: ``integer``
     :param scheme: The scheme for accessing the service (the default is "https").
     :type scheme: "https" or "http"
+    :param hosts: Several Splunk instances to spread requests across, such as
+        the members of a search head cluster (optional, replaces *host*). Each
+        entry is a host name, which gets *port*, a ``"host:port"`` string, or a
+        ``(host, port)`` tuple.
+    :type hosts: ``list``
+    :param balance: How reads are spread across *hosts*: in turn, or to the
+        host with the fewest requests in flight (the default is
+        "round_robin").
+    :type balance: "round_robin" or "least_outstanding"
+    :param health_check_interval: How many seconds a host that failed is
+        skipped before requests try it again (the default is 30).
+    :type health_check_interval: ``integer``
+    :param coalesce: When ``True``, concurrent identical ``GET`` requests
+        share a single request to the server (the default is ``False``).
+    :type coalesce: ``Boolean``
+    :param cache: A cache for the responses to :meth:`get` (optional; by
+        default every request goes to the server).
+    :type cache: :class:`ResponseCache`
+    :param token_cache: A file of session tokens to reuse across processes
+        (optional).
+    :type token_cache: :class:`TokenCache`
     :param sharing: The sharing mode for the namespace (the default is "user").
     :type sharing: "global", "system", "app", or "user"
     :param owner: The owner context of the namespace (optional, the default is "None").
@@ -396,8 +800,46 @@ class Context(object):
     :param password: The password for the Splunk account.
     :type password: ``string``
     :param handler: The HTTP request handler (optional).
+    :param retry: The policy for retrying failed requests (optional; by
+        default failed requests are not retried).
+    :type retry: :class:`RetryPolicy`
+    :param limit: A limit on the requests in flight and the request rate to
+        each host (optional).
+    :type limit: :class:`RateLimiter`
+    :param instrument: A function that is called with a record of the timings
+        of every request (optional). See :class:`HttpLib` for the fields of
+        the record, and :class:`RequestStats` for a function that aggregates
+        them.
     :returns: A ``Context`` instance.
 
+    A single ``Context`` can be shared by several threads. Logins are
+    serialized, so when a session expires and ``autologin`` is ``True``,
+    the threads that see the resulting 401 wait for one new login instead of
+    each logging in. To also reuse connections across requests, pass a
+    pooling handler, which checks out a connection for each request in
+    flight.
+
+    With *hosts*, each request goes to one of the hosts, which has its own
+    session token; the ``host``, ``port``, ``authority``, and ``token``
+    attributes are those of the host serving the request in the current
+    thread, or of the first host outside of a request. ``GET`` requests are
+    balanced across the hosts, while other requests go to the first host that
+    is up. A search job or entity created by a write is pinned to the host
+    that created it, so the requests under its path, such as the polls of a
+    search job, go to that host while it is up. When a
+    host is unreachable or answers 502, 503, or 504, the host is skipped for
+    *health_check_interval* seconds and reads are sent to the next host.
+    Writes fail over only when they cannot have reached the host. A host is
+    logged in the first time a request is sent to it. See :meth:`check_health`
+    to probe the hosts.
+
+    With *coalesce*, a :meth:`get` that is identical to one already in
+    flight in another thread (same path, namespace, query, and session)
+    waits for that request and shares its response instead of sending its
+    own. Each caller gets its own copy of the body, which is read in full
+    before it is returned, so ``coalesce`` is best suited to many threads
+    polling the same small resources.
+
     **Example**::
 
         import splunklib.binding as binding
@@ -407,21 +849,81 @@ class Context(object):
         c = binding.connect(username="boris", password="natasha")
         # Of if you already have a session token
         c = binding.Context(token="atg232342aa34324a")
+        # Or to share the context between threads
+        c = binding.connect(handler=binding.handler(pool_size=8),
+                            autologin=True, ...)
+        # Or to spread requests over a search head cluster
+        c = binding.connect(hosts=["sh1", "sh2", "sh3:8090"],
+                            balance="least_outstanding", ...)
     """
     def __init__(self, handler=None, **kwargs):
-        self.http = HttpLib(handler)
-        self.token = kwargs.get("token", _NoAuthenticationToken)
-        if self.token is None: # In case someone explicitly passes token=None
-            self.token = _NoAuthenticationToken
-        self.scheme = kwargs.get("scheme", DEFAULT_SCHEME)
-        self.host = kwargs.get("host", DEFAULT_HOST)
-        self.port = int(kwargs.get("port", DEFAULT_PORT))
-        self.authority = _authority(self.scheme, self.host, self.port)
+        self.http = HttpLib(handler, kwargs.get("retry"),
+                            kwargs.get("instrument"), kwargs.get("limit"))
+        self._auth_lock = threading.RLock()
+        self._local = threading.local()
+        token = kwargs.get("token", _NoAuthenticationToken)
+        if token is None: # In case someone explicitly passes token=None
+            token = _NoAuthenticationToken
+        scheme = kwargs.get("scheme", DEFAULT_SCHEME)
+        port = kwargs.get("port", DEFAULT_PORT)
+        hosts = kwargs.get("hosts") or \
+            [(kwargs.get("host", DEFAULT_HOST), port)]
+        self._members = [_Member(scheme, host, port, token)
+                         for host, port in (_endpoint(h, port) for h in hosts)]
+        self._balancer = _Balancer(self._members,
+                                   kwargs.get("balance", "round_robin"),
+                                   kwargs.get("health_check_interval", 30))
+        self._logged_in = False
+        self._single_flight = _SingleFlight() if kwargs.get("coalesce") else None
+        self._cache = kwargs.get("cache")
+        self._token_cache = kwargs.get("token_cache")
         self.namespace = namespace(**kwargs)
         self.username = kwargs.get("username", "")
         self.password = kwargs.get("password", "")
         self.autologin = kwargs.get("autologin", False)
 
+    @property
+    def _current(self):
+        """The member that the request in flight in this thread was sent to,
+        or ``None``."""
+        return getattr(self._local, "member", None)
+
+    @property
+    def _member(self):
+        return self._current or self._members[0]
+
+    @property
+    def scheme(self):
+        return self._member.scheme
+
+    @property
+    def host(self):
+        return self._member.host
+
+    @host.setter
+    def host(self, value):
+        self._member.host = value
+
+    @property
+    def port(self):
+        return self._member.port
+
+    @property
+    def authority(self):
+        return self._member.authority
+
+    @property
+    def token(self):
+        """The session token of the current member."""
+        return self._member.token
+
+    @token.setter
+    def token(self, value):
+        # Outside of a request, a token is set for every member.
+        members = [self._current] if self._current else self._members
+        for member in members:
+            member.token = value
+
     # Shared per-context request headers
     @property
     def _auth_headers(self):
@@ -433,14 +935,13 @@ class Context(object):
 
         :returns: A list of 2-tuples containing key and value
         """
-        if self.token is _NoAuthenticationToken:
+        token = self.token
+        if token is _NoAuthenticationToken:
             return []
         else:
             # Ensure the token is properly formatted
-            if self.token.startswith('Splunk '):
-                token = self.token
-            else:
-                token = 'Splunk %s' % self.token
+            if not token.startswith('Splunk '):
+                token = 'Splunk %s' % token
             return [("Authorization", token)]
 
     def connect(self):
@@ -470,8 +971,8 @@ class Context(object):
         sock.connect((socket.gethostbyname(self.host), self.port))
         return sock
 
+    @_routed
     @_authentication
-    @_log_duration
     def delete(self, path_segment, owner=None, app=None, sharing=None, **query):
         """Performs a DELETE operation at the REST path segment with the given
         namespace and query.
@@ -525,11 +1026,13 @@ class Context(object):
         path = self.authority + self._abspath(path_segment, owner=owner,
                                               app=app, sharing=sharing)
         logging.debug("DELETE request to %s (body: %s)", path, repr(query))
-        response = self.http.delete(path, self._auth_headers, **query)
-        return response
+        try:
+            return self.http.delete(path, self._auth_headers, **query)
+        finally:
+            self._invalidate(path)
 
+    @_routed
     @_authentication
-    @_log_duration
     def get(self, path_segment, owner=None, app=None, sharing=None, **query):
         """Performs a GET operation from the REST path segment with the given
         namespace and query.
@@ -583,11 +1086,23 @@ class Context(object):
         path = self.authority + self._abspath(path_segment, owner=owner,
                                               app=app, sharing=sharing)
         logging.debug("GET request to %s (body: %s)", path, repr(query))
-        response = self.http.get(path, self._auth_headers, **query)
-        return response
-
+        if self._single_flight is None and self._cache is None:
+            return self.http.get(path, self._auth_headers, **query)
+        auth_headers = self._auth_headers
+        query_key = repr(sorted(query.items()))
+        def send(headers):
+            headers = auth_headers + headers
+            if self._single_flight is None:
+                return self.http.get(path, headers, **query)
+            return self._single_flight.do(
+                (path, query_key, repr(headers)),
+                lambda: self.http.get(path, headers, **query))
+        if self._cache is None:
+            return send([])
+        return self._cache._fetch(path, query_key, repr(auth_headers), send)
+
+    @_routed
     @_authentication
-    @_log_duration
     def post(self, path_segment, owner=None, app=None, sharing=None, headers=None, **query):
         """Performs a POST operation from the REST path segment with the given
         namespace and query.
@@ -606,7 +1121,9 @@ class Context(object):
         and all metadata passed as GET-style arguments. If you provide
         a ``body`` argument to ``post``, it will be used as the POST
         body, and all other keyword arguments will be passed as
-        GET-style arguments in the URL.
+        GET-style arguments in the URL. The body can be a string, a
+        file-like object, or an iterable of strings; the latter two are
+        streamed to the server without reading them into memory first.
 
         :raises AuthenticationError: Raised when the ``Context`` object is not
              logged in.
@@ -656,11 +1173,13 @@ class Context(object):
         path = self.authority + self._abspath(path_segment, owner=owner, app=app, sharing=sharing)
         logging.debug("POST request to %s (body: %s)", path, repr(query))
         all_headers = headers + self._auth_headers
-        response = self.http.post(path, all_headers, **query)
-        return response
+        try:
+            return self.http.post(path, all_headers, **query)
+        finally:
+            self._invalidate(path)
 
+    @_routed
     @_authentication
-    @_log_duration
     def request(self, path_segment, method="GET", headers=None, body="",
                 owner=None, app=None, sharing=None):
         """Issues an arbitrary HTTP request to the REST path segment.
@@ -683,7 +1202,7 @@ class Context(object):
         :param headers: List of extra HTTP headers to send (optional).
         :type headers: ``list`` of 2-tuples.
         :param body: Content of the HTTP request (optional).
-        :type body: ``string``
+        :type body: ``string``, file-like object, or iterable of ``string``s
         :param owner: The owner context of the namespace (optional).
         :type owner: ``string``
         :param app: The app context of the namespace (optional).
@@ -724,12 +1243,90 @@ class Context(object):
         all_headers = headers + self._auth_headers
         logging.debug("%s request to %s (headers: %s, body: %s)",
                       method, path, str(all_headers), repr(body))
-        response = self.http.request(path,
+        try:
+            return self.http.request(path,
                                      {'method': method,
                                      'headers': all_headers,
                                      'body': body})
-        return response
+        finally:
+            if method not in ("GET", "HEAD"):
+                self._invalidate(path)
+
+    def batch(self, requests, max_workers=8, ordered=True, lookahead=None):
+        """Issues many requests at once, from up to *max_workers* threads.
+
+        Each request is a tuple ``(method, path_segment)`` or ``(method,
+        path_segment, kwargs)``, where *kwargs* is a ``dict`` of the keyword
+        arguments to pass to :meth:`get`, :meth:`post`, or :meth:`delete` for
+        those methods, or to :meth:`request` for others. The body of each
+        response is read in full by the thread that made the request.
+
+        Every request is made, even if some fail. Each result is a record with
+        the fields ``index`` (the position of the request in *requests*),
+        ``request``, ``response``, ``error``, and ``exc_info``. Either
+        ``response`` is the response and ``error`` is ``None``, or
+        ``response`` is ``None``, ``error`` is the exception that the request
+        raised, and ``exc_info`` is its ``sys.exc_info()``, so that it can be
+        raised again with the traceback of the thread that made the request.
+
+        The requests share this ``Context``, so pass a pooling handler (see
+        :func:`handler`) with a *pool_size* of at least *max_workers* to reuse
+        connections between them.
+
+        :param requests: The requests to make.
+        :type requests: ``list`` of ``tuple``s
+        :param max_workers: The maximum number of requests in flight (the
+            default is 8).
+        :type max_workers: ``integer``
+        :param ordered: Whether results come in the order of *requests*,
+            rather than as soon as they are done (the default is ``True``).
+        :type ordered: ``boolean``
+        :param lookahead: The maximum number of requests that are made or
+            held before the caller takes their results, which caps the
+            memory used by bodies waiting to be read. If this value is
+            ``None`` (the default), all of the requests are made as fast as
+            the workers allow.
+        :type lookahead: ``integer``
+        :return: An iterator over the results. No request is made until the
+            first result is asked for. If you stop before the last result,
+            close the iterator (or drop it) so that no more requests are made.
+
+        **Example**::
+
+            import splunklib.binding as binding
+            c = binding.connect(handler=binding.handler(pool_size=8), ...)
+            requests = [("GET", "saved/searches/%s" % name) for name in names]
+            for result in c.batch(requests):
+                if result.error is not None:
+                    print result.request, result.error
+                else:
+                    print result.response.body.read()
+        """
+        return _pooled(self._batch_item, requests, max_workers, ordered,
+                       lookahead)
 
+    def _batch_item(self, index, request):
+        method, path_segment = request[0].upper(), request[1]
+        kwargs = request[2] if len(request) > 2 else {}
+        response = error = exc_info = None
+        try:
+            if method == "GET":
+                response = self.get(path_segment, **kwargs)
+            elif method == "POST":
+                response = self.post(path_segment, **kwargs)
+            elif method == "DELETE":
+                response = self.delete(path_segment, **kwargs)
+            else:
+                response = self.request(path_segment, method=method, **kwargs)
+            response = record(dict(
+                response, body=ResponseReader(StringIO(response.body.read()))))
+        except Exception as e:
+            response, error, exc_info = None, e, sys.exc_info()
+        return record({'index': index, 'request': request,
+                       'response': response, 'error': error,
+                       'exc_info': exc_info})
+
+    @_routed
     def login(self):
         """Logs into the Splunk instance referred to by the :class:`Context`
         object.
@@ -755,26 +1352,94 @@ class Context(object):
             # password, then login is a nop, since we're automatically
             # logged in.
             return
-        try:
-            response = self.http.post(
-                self.authority + self._abspath("/services/auth/login"),
-                username=self.username,
-                password=self.password)
-            body = response.body.read()
-            session = XML(body).findtext("./sessionKey")
-            self.token = "Splunk %s" % session
-            return self
-        except HTTPError as he:
-            if he.status == 401:
-                raise AuthenticationError("Login failed.", he)
-            else:
-                raise
+        with self._auth_lock:
+            if self._token_cache is not None:
+                token = self._token_cache.get(self.host, self.port,
+                                              self.username, self.password)
+                # The token that a 401 just rejected is not worth trying again.
+                if token is not None and token != self.token:
+                    self.token = token
+                    self._logged_in = True
+                    return self
+            try:
+                response = self.http.post(
+                    self.authority + self._abspath("/services/auth/login"),
+                    username=self.username,
+                    password=self.password)
+                body = response.body.read()
+                session = etree.XML(body).findtext("./sessionKey")
+                self.token = "Splunk %s" % session
+                self._logged_in = True
+                if self._token_cache is not None:
+                    self._token_cache.set(self.host, self.port, self.username,
+                                          self.password, self.token)
+                return self
+            except HTTPError as he:
+                if he.status == 401:
+                    raise AuthenticationError("Login failed.", he)
+                else:
+                    raise
+
+    def _relogin(self, stale_token):
+        """Logs in again, unless another thread already replaced *stale_token*.
+
+        :param stale_token: The token that was in use when the request that
+            triggered the login was issued.
+        :return: The current session token.
+        """
+        with self._auth_lock:
+            if self.token is stale_token or self.token == stale_token:
+                self.login()
+            return self.token
+
+    def _invalidate(self, url):
+        """Drops the cached responses that a write to *url* made stale."""
+        if self._cache is None:
+            return
+        endpoint = _endpoint_path(_spliturl(url)[3])
+        # The entity and everything under it, and the collection that
+        # lists it.
+        self._cache.invalidate(endpoint.rsplit('/', 1)[0])
 
     def logout(self):
         """Forgets the current session token."""
-        self.token = _NoAuthenticationToken
+        with self._auth_lock:
+            self.token = _NoAuthenticationToken
+            self._logged_in = False
         return self
 
+    def check_health(self):
+        """Probes each host of the ``Context`` and returns those that respond.
+
+        Hosts that do not respond are skipped by requests until they have
+        been down for *health_check_interval* seconds, and hosts that
+        respond are used again right away. Any HTTP response, including an
+        error status other than 502, 503, or 504, counts as a response.
+
+        :return: The hosts that responded.
+        :rtype: ``list`` of ``(host, port)`` tuples
+
+        **Example**::
+
+            import splunklib.binding as binding
+            c = binding.connect(hosts=["sh1:8089", "sh2:8089", "sh3:8089"], ...)
+            c.check_health() == [('sh1', 8089), ('sh3', 8089)]
+        """
+        alive = []
+        for member in self._members:
+            try:
+                response = self.http.get(member.authority + "/services/server/info")
+                response.body.close()
+                up = True
+            except HTTPError as he:
+                up = he.status not in (502, 503, 504)
+            except (socket.error, httplib.HTTPException, CircuitOpenError):
+                up = False
+            self._balancer.mark(member, up)
+            if up:
+                alive.append((member.host, member.port))
+        return alive
+
     def _abspath(self, path_segment,
                 owner=None, app=None, sharing=None):
         """Qualifies *path_segment* into an absolute path for a URL.
@@ -867,6 +1532,27 @@ def connect(**kwargs):
     :param autologin: When ``True``, automatically tries to log in again if the
         session terminates.
     :type autologin: ``Boolean``
+    :param hosts: Several Splunk instances to spread requests across
+        (optional). See :class:`Context`.
+    :type hosts: ``list``
+    :param balance: How reads are spread across *hosts* (the default is
+        "round_robin").
+    :type balance: "round_robin" or "least_outstanding"
+    :param coalesce: When ``True``, concurrent identical ``GET`` requests
+        share a single request to the server (the default is ``False``).
+    :type coalesce: ``Boolean``
+    :param cache: A cache for the responses to ``GET`` requests (optional).
+    :type cache: :class:`ResponseCache`
+    :param token_cache: A file of session tokens to reuse across processes
+        (optional).
+    :type token_cache: :class:`TokenCache`
+    :param retry: The policy for retrying failed requests (optional).
+    :type retry: :class:`RetryPolicy`
+    :param limit: A limit on the requests in flight and the request rate to
+        each host (optional).
+    :type limit: :class:`RateLimiter`
+    :param instrument: A function that is called with a record of the timings
+        of every request (optional).
     :return: An initialized :class:`Context` instance.
 
     **Example**::
@@ -879,6 +1565,127 @@ def connect(**kwargs):
     c.login()
     return c
 
+class TokenCache(object):
+    """A file of session tokens that lets short-lived processes share
+    sessions instead of each logging in.
+
+    Pass a ``TokenCache`` as the ``token_cache`` argument of a
+    :class:`Context` or :class:`splunklib.client.Service`. Then
+    :meth:`Context.login` uses the token saved for the host, port,
+    username, and password, if there is one, without checking it with the
+    server, and saves the token of each new session. Tokens are saved under
+    a salted hash of the password, so that a token is only handed to callers
+    that know the password it was obtained with, and the file does not give
+    the password away. If the saved token has expired, the
+    first request gets a 401, and the ``Context`` logs in once, whether or
+    not ``autologin`` is set.
+
+    The file is made readable and writable only by its owner when it is
+    written, and is locked while it is read or written, except on Windows.
+    A missing file is created by the first token saved. Failures to read or
+    write the file are logged and otherwise ignored.
+
+    :param path: The path of the file (the default is ``~/.splunktokens``).
+    :type path: ``string``
+
+    **Example**::
+
+        import splunklib.binding as binding
+        import splunklib.client as client
+        s = client.connect(token_cache=binding.TokenCache(), ...)
+    """
+    def __init__(self, path=DEFAULT_TOKEN_CACHE):
+        self.path = os.path.expanduser(path)
+        self._keys = {}
+
+    def _key(self, host, port, username, password):
+        # Each key is only computed once.
+        args = (host, port, username, password)
+        key = self._keys.get(args)
+        if key is None:
+            key = self._keys[args] = _token_key(*args)
+        return key
+
+    @contextmanager
+    def _locked(self, operation, write=False):
+        if write:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0600)
+        else:
+            fd = os.open(self.path, os.O_RDONLY)
+        f = os.fdopen(fd, "r+" if write else "r")
+        try:
+            if write and hasattr(os, "fchmod"):
+                # O_CREAT only sets the mode of a new file.
+                os.fchmod(fd, 0600)
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), operation)
+            f.seek(0)
+            try:
+                tokens = json.loads(f.read() or "{}")
+            except ValueError:
+                tokens = {}
+            yield f, tokens if isinstance(tokens, dict) else {}
+        finally:
+            f.close()
+
+    def get(self, host, port, username, password):
+        """Returns the saved session token, or ``None``."""
+        key = self._key(host, port, username, password)
+        try:
+            with self._locked(fcntl and fcntl.LOCK_SH) as (f, tokens):
+                return tokens.get(key)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                logging.warning("Could not read token cache %s: %s", self.path, e)
+            return None
+
+    def set(self, host, port, username, password, token):
+        """Saves a session token, replacing the ones saved before for the
+        same host, port, and username."""
+        key = self._key(host, port, username, password)
+        user = _token_user(host, port, username) + "#"
+        try:
+            with self._locked(fcntl and fcntl.LOCK_EX, write=True) as (f, tokens):
+                for old in [k for k in tokens if k.startswith(user)]:
+                    del tokens[old]
+                tokens[key] = token
+                f.seek(0)
+                f.truncate()
+                json.dump(tokens, f)
+        except (IOError, OSError) as e:
+            logging.warning("Could not write token cache %s: %s", self.path, e)
+
+# The number of rounds of PBKDF2-HMAC-SHA256 that the passwords in a token
+# cache are hashed with. The file is only readable by its owner, so this is
+# kept low enough not to cost more than the login it saves.
+_PASSWORD_ROUNDS = 1000
+
+def _token_user(host, port, username):
+    return "%s@%s:%s" % (username, host, port)
+
+def _token_key(host, port, username, password):
+    user = _token_user(host, port, username)
+    if isinstance(password, unicode): password = password.encode('utf-8')
+    salt = user.encode('utf-8') if isinstance(user, unicode) else user
+    if hasattr(hashlib, "pbkdf2_hmac"): # Python 2.7.8+
+        digest = hashlib.pbkdf2_hmac("sha256", password, salt, _PASSWORD_ROUNDS)
+    else:
+        digest = hmac.new(password, salt, hashlib.sha256).digest()
+    return "%s#%s" % (user, binascii.hexlify(digest))
+
+# Returns the first message of an error response, which is XML or JSON
+# depending on the output mode of the request, or the body itself if it
+# can't be parsed.
+def _error_detail(headers, body):
+    content_type = _header(headers or [], "content-type") or ""
+    try:
+        if "json" in content_type:
+            messages = json.loads(body).get("messages") or [{}]
+            return messages[0].get("text")
+        return etree.XML(body).findtext("./messages/msg")
+    except (ValueError, AttributeError, etree.ParseError):
+        return body.strip() or None
+
 # Note: the error response schema supports multiple messages but we only
 # return the first, although we do return the body so that an exception
 # handler that wants to read multiple messages can do so.
@@ -888,7 +1695,7 @@ class HTTPError(Exception):
         status = response.status
         reason = response.reason
         body = response.body.read()
-        detail = XML(body).findtext("./messages/msg")
+        detail = _error_detail(response.headers, body)
         message = "HTTP %d %s%s" % (
             status, reason, "" if detail is None else " -- %s" % detail)
         Exception.__init__(self, _message or message)
@@ -912,6 +1719,19 @@ class AuthenticationError(HTTPError):
 
         HTTPError.__init__(self, cause._response, message)
 
+class CircuitOpenError(Exception):
+    """Raised when a :class:`RetryPolicy` refuses to send a request to a host
+    that has failed repeatedly, such as a splunkd instance that is restarting.
+
+    The host is tried again once the policy's ``reset_timeout`` has passed.
+    """
+    def __init__(self, host, port, retry_at):
+        Exception.__init__(self, "Requests to %s:%s are suspended after repeated "
+                                 "failures." % (host, port))
+        self.host = host
+        self.port = port
+        self.retry_at = retry_at
+
 #
 # The HTTP interface used by the Splunk binding layer abstracts the underlying
 # HTTP library using request & response 'messages' which are implemented as
@@ -956,6 +1776,592 @@ def _spliturl(url):
     if port is None: port = DEFAULT_PORT
     return scheme, host, port, path
 
+# Returns the value of the named header from a list of pairs or a dict of
+# headers, or None if it isn't there.
+def _header(headers, name):
+    name = name.lower()
+    for key, value in dict(headers).iteritems():
+        if key.lower() == name:
+            return value
+    return None
+
+# Parses a Retry-After header, which is either a number of seconds or an HTTP
+# date, into a number of seconds from now.
+def _retry_after(value):
+    if value is None:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0, mktime_tz(parsed) - time.time())
+
+
+class RetryPolicy(object):
+    """A policy for retrying failed requests, for use with :class:`Context`.
+
+    Requests with an idempotent method (by default ``GET``, ``DELETE``,
+    ``HEAD``, ``OPTIONS``, and ``PUT``) that fail with a socket error or with
+    one of the given HTTP *statuses* are retried up to *retries* times. The
+    delay before each retry grows exponentially from *backoff* seconds up to
+    *max_backoff* seconds, and is randomized when *jitter* is ``True`` so that
+    many clients don't reconnect in lockstep. A 503 response with a
+    ``Retry-After`` header is retried after the time the server asks for,
+    unless that is longer than *max_backoff*. Requests with a streamed body are
+    never retried, because their body can't be sent twice.
+
+    The policy also keeps a circuit breaker for each host: after
+    *failure_threshold* consecutive failed requests, requests to that host
+    raise :class:`CircuitOpenError` right away for *reset_timeout* seconds.
+    After that, requests go through again, and the first success closes the
+    circuit.
+
+    A single policy can be shared by several ``Context`` objects and threads.
+
+    :param retries: The maximum number of retries per request (the default is 3).
+    :type retries: ``integer``
+    :param backoff: The delay before the first retry, in seconds (the default
+        is 0.5).
+    :type backoff: ``float``
+    :param max_backoff: The longest delay before a retry, in seconds (the
+        default is 30).
+    :type max_backoff: ``float``
+    :param jitter: Whether to randomize delays (the default is ``True``).
+    :type jitter: ``boolean``
+    :param statuses: The HTTP statuses to retry (the default is 502, 503, and 504).
+    :type statuses: ``list`` of ``integer``s
+    :param methods: The HTTP methods that may be retried.
+    :type methods: ``list`` of ``string``s
+    :param failure_threshold: The number of consecutive failures that opens
+        the circuit for a host (the default is 5; use "None" to disable the
+        circuit breaker).
+    :type failure_threshold: ``integer`` or "None"
+    :param reset_timeout: How long the circuit stays open, in seconds (the
+        default is 30).
+    :type reset_timeout: ``float``
+
+    **Example**::
+
+        import splunklib.binding as binding
+        c = binding.connect(retry=binding.RetryPolicy(retries=5), ...)
+    """
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30, jitter=True,
+                 statuses=(502, 503, 504),
+                 methods=("GET", "DELETE", "HEAD", "OPTIONS", "PUT"),
+                 failure_threshold=5, reset_timeout=30):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+        self.methods = methods
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # (scheme, host, port) => (consecutive failures, time opened)
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def delay(self, attempt, retry_after=None):
+        """Returns the number of seconds to wait before retry number *attempt*
+        (counting from 0), or "None" if the request should not be retried.
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def _check_circuit(self, key):
+        with self._lock:
+            failures, opened = self._circuits.get(key, (0, None))
+        if opened is not None and time.time() < opened + self.reset_timeout:
+            raise CircuitOpenError(key[1], key[2], opened + self.reset_timeout)
+
+    def _record(self, key, failed):
+        with self._lock:
+            if not failed:
+                self._circuits.pop(key, None)
+                return
+            failures, opened = self._circuits.get(key, (0, None))
+            failures += 1
+            if self.failure_threshold is not None and \
+                    failures >= self.failure_threshold:
+                opened = time.time()
+            self._circuits[key] = (failures, opened)
+
+    def request(self, send, url, message):
+        """Calls *send* with *url* and *message*, retrying as the policy allows.
+
+        :param send: A function of a URL and a request message that returns
+            a response message or raises an exception (such as
+            :meth:`HttpLib.send`).
+        :returns: The response message returned by *send*.
+        """
+        key = _spliturl(url)[:3]
+        method = message.get("method", "GET").upper()
+        replayable = method in self.methods and \
+            isinstance(message.get("body", ""), basestring)
+        attempt = 0
+        while True:
+            self._check_circuit(key)
+            retry_after = None
+            try:
+                response = send(url, message)
+            except HTTPError as he:
+                if he.status not in self.statuses:
+                    self._record(key, False)
+                    raise
+                if he.status == 503:
+                    retry_after = _retry_after(_header(he.headers, "Retry-After"))
+                self._record(key, True)
+                error = sys.exc_info()
+            except (socket.error, httplib.HTTPException):
+                self._record(key, True)
+                error = sys.exc_info()
+            else:
+                self._record(key, False)
+                return response
+            delay = self.delay(attempt, retry_after) \
+                if replayable and attempt < self.retries else None
+            if delay is None:
+                raise error[0], error[1], error[2]
+            logging.debug("%s request to %s failed (%s), retrying in %.2f seconds",
+                          method, url, error[1], delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+class RateLimiter(object):
+    """Limits the requests sent to each host, for use with :class:`Context`.
+
+    At most *max_in_flight* requests to a host are sent at the same time, and
+    if *rate* is given, requests to a host start at no more than *rate* per
+    second on average, with bursts of up to *burst* requests. A request is in
+    flight until the headers of its response arrive. Callers that have to wait
+    are served in the order in which they arrived. Retries and logins count as
+    requests, too.
+
+    A single limiter can be shared by several ``Context`` objects and threads,
+    which then share its limits.
+
+    :param max_in_flight: The maximum number of requests in flight to a host
+        (optional; by default there is no limit).
+    :type max_in_flight: ``integer``
+    :param rate: The maximum number of requests per second to a host
+        (optional; by default there is no limit).
+    :type rate: ``float``
+    :param burst: The number of requests that can start at once after a
+        quiet period (the default is *rate*, and at least 1).
+    :type burst: ``integer``
+
+    **Example**::
+
+        import splunklib.binding as binding
+        limiter = binding.RateLimiter(max_in_flight=8, rate=50)
+        c = binding.connect(limit=limiter, ...)
+        ...
+        print limiter.waiting()
+    """
+    def __init__(self, max_in_flight=None, rate=None, burst=None):
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = max(1, rate or 0) if burst is None else burst
+        # (scheme, host, port) => record of in_flight, tokens, updated, and
+        # the queue of waiting callers.
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _host(self, key):
+        host = self._hosts.get(key)
+        if host is None:
+            host = self._hosts[key] = record({
+                'in_flight': 0, 'tokens': self.burst, 'updated': time.time(),
+                'queue': collections.deque()})
+        return host
+
+    # Returns how long the caller at the head of the queue of *host* has to
+    # wait, 0 if it can go, or None if it has to wait for a request to end.
+    def _delay(self, host):
+        if self.max_in_flight is not None and \
+                host.in_flight >= self.max_in_flight:
+            return None
+        if self.rate is None:
+            return 0
+        now = time.time()
+        host.tokens = min(self.burst,
+                          host.tokens + (now - host.updated) * self.rate)
+        host.updated = now
+        return 0 if host.tokens >= 1 else (1 - host.tokens) / self.rate
+
+    def _acquire(self, key):
+        """Waits until a request can be sent to *key*, a ``(scheme, host,
+        port)`` tuple."""
+        ticket = object()
+        with self._condition:
+            host = self._host(key)
+            host.queue.append(ticket)
+            try:
+                while True:
+                    delay = self._delay(host) if host.queue[0] is ticket else None
+                    if delay == 0:
+                        break
+                    self._condition.wait(delay)
+            finally:
+                host.queue.remove(ticket)
+                # Let the next caller in the queue check its turn.
+                self._condition.notify_all()
+            host.in_flight += 1
+            if self.rate is not None:
+                host.tokens -= 1
+
+    def _release(self, key):
+        with self._condition:
+            self._host(key).in_flight -= 1
+            self._condition.notify_all()
+
+    def waiting(self, host=None, port=None):
+        """Returns the number of callers waiting to send a request.
+
+        :param host: Only count callers waiting for this host (optional).
+        :type host: ``string``
+        :param port: Only count callers waiting for this port (optional).
+        :type port: ``integer``
+        """
+        with self._condition:
+            return sum(len(state.queue) for key, state in self._hosts.iteritems()
+                       if host in (None, key[1]) and port in (None, int(key[2])))
+
+    def in_flight(self, host=None, port=None):
+        """Returns the number of requests in flight, with the same
+        parameters as :meth:`waiting`."""
+        with self._condition:
+            return sum(state.in_flight for key, state in self._hosts.iteritems()
+                       if host in (None, key[1]) and port in (None, int(key[2])))
+
+
+# The upper bound, in seconds, of the first bucket of a _Histogram, and the
+# ratio between the upper bounds of consecutive buckets.
+_HISTOGRAM_BASE = 0.0001
+_HISTOGRAM_RATIO = 1.1
+
+class _Histogram(object):
+    """Counts durations in logarithmic buckets, so that percentiles can be
+    estimated to within 10% in constant memory."""
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self._buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        if value <= _HISTOGRAM_BASE:
+            index = 0
+        else:
+            index = int(math.ceil(math.log(value / _HISTOGRAM_BASE, _HISTOGRAM_RATIO)))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+
+    def percentile(self, p):
+        """Returns the upper bound of the bucket holding the *p*th percentile."""
+        if self.count == 0:
+            return None
+        rank = p / 100.0 * self.count
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                break
+        return _HISTOGRAM_BASE * _HISTOGRAM_RATIO ** index
+
+# Strips the namespace prefix from an absolute REST path, so that requests to
+# the same endpoint in different namespaces are counted together.
+def _endpoint_path(path):
+    if path.startswith("/servicesNS/"):
+        return path.split("/", 4)[-1]
+    if path.startswith("/services/"):
+        return path[len("/services/"):]
+    return path
+
+# Collections whose entities are named by the path segments that follow the
+# collection, with the placeholders that RequestStats counts them under.
+_ENTITY_NAMES = {
+    "alerts/fired_alerts": ("{name}",),
+    "apps/local": ("{name}",),
+    "authentication/users": ("{name}",),
+    "authorization/capabilities": ("{name}",),
+    "authorization/roles": ("{name}",),
+    "data/indexes": ("{name}",),
+    "data/inputs/monitor": ("{name}",),
+    "data/inputs/script": ("{name}",),
+    "data/inputs/tcp/cooked": ("{name}",),
+    "data/inputs/tcp/raw": ("{name}",),
+    "data/inputs/udp": ("{name}",),
+    "data/modular-inputs": ("{name}",),
+    "deployment/client": ("{name}",),
+    "deployment/server": ("{name}",),
+    "deployment/serverclass": ("{name}",),
+    "deployment/tenants": ("{name}",),
+    "messages": ("{name}",),
+    "properties": ("{file}", "{stanza}", "{key}"),
+    "saved/eventtypes": ("{name}",),
+    "saved/searches": ("{name}",),
+    "search/jobs": ("{sid}",),
+    "server/logger": ("{name}",),
+    "storage/passwords": ("{name}",),
+}
+
+# Returns the path template of a REST path, with the namespace stripped and
+# the names of entities replaced by placeholders, so that requests to every
+# entity of a collection are counted together, for example
+# "search/jobs/{sid}/results". Segments that start with an underscore, such
+# as "_new" and "_reload", and "search/jobs/export" are endpoints of the
+# collection itself rather than entities.
+def _endpoint_template(path):
+    segments = _endpoint_path(path).strip("/").split("/")
+    for size in range(len(segments) - 1, 0, -1):
+        collection = "/".join(segments[:size])
+        if collection in _ENTITY_NAMES:
+            names = _ENTITY_NAMES[collection]
+        elif size == 2 and segments[0] == "configs":
+            names = ("{name}",)
+        else:
+            continue
+        rest = segments[size:]
+        if rest[0].startswith("_") or collection + "/" + rest[0] == "search/jobs/export":
+            break
+        count = min(len(names), len(rest))
+        return "/".join(segments[:size] + list(names[:count]) + rest[count:])
+    return "/".join(segments)
+
+
+class RequestStats(object):
+    """An instrumentation function that aggregates requests by endpoint.
+
+    Pass a ``RequestStats`` object as the ``instrument`` argument of a
+    :class:`Context` or :class:`splunklib.client.Service`, and call
+    :meth:`summary` whenever you want to know where the time went. Requests
+    are grouped by method and by path template: the namespace is ignored,
+    and the names of the entities of known collections are replaced by
+    placeholders, so that polling any number of search jobs is counted under
+    ``search/jobs/{sid}``. To group requests differently, pass a function
+    that takes the path of a request and returns the path to count it under
+    as *key*.
+
+    **Example**::
+
+        import splunklib.binding as binding
+        stats = binding.RequestStats()
+        c = binding.connect(instrument=stats, ...)
+        ...
+        for endpoint in stats.summary():
+            print endpoint.method, endpoint.path, endpoint.count, endpoint.p95
+    """
+    def __init__(self, key=None):
+        self._key = _endpoint_template if key is None else key
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, stats):
+        key = (stats.method, self._key(stats.path))
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = {
+                    'time': _Histogram(), 'errors': 0, 'retries': 0,
+                    'bytes_sent': 0, 'bytes_received': 0}
+            endpoint['time'].add(stats.total)
+            endpoint['retries'] += stats.retries
+            if stats.error is not None:
+                endpoint['errors'] += 1
+            endpoint['bytes_sent'] += stats.bytes_sent or 0
+            endpoint['bytes_received'] += stats.bytes_received or 0
+
+    def reset(self):
+        """Forgets all the requests counted so far."""
+        with self._lock:
+            self._endpoints = {}
+
+    def summary(self):
+        """Returns the statistics of each endpoint, busiest first.
+
+        :return: A ``list`` of records with the fields ``method``, ``path``,
+            ``count``, ``errors``, ``retries``, ``bytes_sent``,
+            ``bytes_received``, ``time`` (the total time spent, in seconds),
+            and ``p50``, ``p95``, and ``p99`` (percentiles of the time per
+            request, in seconds).
+        """
+        with self._lock:
+            result = []
+            for (method, path), endpoint in self._endpoints.iteritems():
+                histogram = endpoint['time']
+                result.append(record({
+                    'method': method,
+                    'path': path,
+                    'count': histogram.count,
+                    'errors': endpoint['errors'],
+                    'retries': endpoint['retries'],
+                    'bytes_sent': endpoint['bytes_sent'],
+                    'bytes_received': endpoint['bytes_received'],
+                    'time': histogram.sum,
+                    'p50': histogram.percentile(50),
+                    'p95': histogram.percentile(95),
+                    'p99': histogram.percentile(99),
+                }))
+        result.sort(key=lambda endpoint: endpoint.time, reverse=True)
+        return result
+
+
+def _under(endpoint, prefix):
+    """Returns whether *endpoint* is *prefix* or a path under it."""
+    prefix = prefix.strip('/')
+    return endpoint == prefix or endpoint.startswith(prefix + '/') or not prefix
+
+# Endpoints that are never cached unless a ResponseCache is told otherwise,
+# since their state changes on the server without any request from us.
+_UNCACHED_ENDPOINTS = {"search/jobs": 0, "messages": 0}
+
+class ResponseCache(object):
+    """A cache of the responses to ``GET`` requests, shared by the requests
+    of a :class:`Context`.
+
+    Pass a ``ResponseCache`` as the ``cache`` argument of a :class:`Context`
+    or :class:`splunklib.client.Service`, and :meth:`Context.get` returns a
+    cached response as long as it is fresh. Responses are cached by
+    absolute path, namespace, query, and session, and only successful
+    responses are cached. Each caller gets its own copy of the body. Since a
+    response is only returned to requests made with the session that fetched
+    it, one cache can be shared by contexts logged in as different users.
+
+    A response stays fresh for the time to live of its endpoint: the value
+    in *ttls* for the longest prefix of the path without its namespace, or
+    *ttl* if no prefix matches. Search jobs and messages are not cached
+    unless *ttls* says otherwise. splunkd marks all its responses as not
+    cacheable, so these times are the only thing that decides freshness.
+    When a stale response has an ``ETag`` or ``Last-Modified`` header, it
+    is revalidated with a conditional request, and kept if the server
+    answers 304.
+
+    Any ``POST`` or ``DELETE`` through the ``Context`` drops the cached
+    responses of its endpoint and of the endpoints under it, as well as those
+    of the collection that contains it, in every namespace. When the cache
+    holds more than *max_bytes* of bodies, the least recently used responses
+    are dropped.
+
+    :param max_bytes: The maximum size of the cached bodies (the default is
+        16 MB).
+    :type max_bytes: ``integer``
+    :param ttl: The time to live of a response, in seconds (the default
+        is 60).
+    :type ttl: ``integer``
+    :param ttls: Times to live for endpoints, by path prefix, such as
+        ``{"apps/local": 600, "server/info": 0}``. A time of 0 disables
+        caching of the endpoint.
+    :type ttls: ``dict``
+
+    **Example**::
+
+        import splunklib.binding as binding
+        c = binding.connect(cache=binding.ResponseCache(ttls={"configs": 300}), ...)
+        c.get("apps/local") # Sends a request
+        c.get("apps/local") # Does not
+    """
+    def __init__(self, max_bytes=16*1024*1024, ttl=60, ttls=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttls = dict(_UNCACHED_ENDPOINTS)
+        self.ttls.update(ttls or {})
+        self._entries = OrderedDict()
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _ttl(self, endpoint):
+        matches = [prefix for prefix in self.ttls if _under(endpoint, prefix)]
+        if not matches:
+            return self.ttl
+        return self.ttls[max(matches, key=len)]
+
+    def _fetch(self, url, query, session, send):
+        """Returns the response to a ``GET`` of *url* with *query*, made with
+        the authorization headers *session*, from the cache or by calling
+        *send* with a list of extra request headers."""
+        ttl = self._ttl(_endpoint_path(_spliturl(url)[3]))
+        if ttl <= 0:
+            return send([])
+        key = (url, query, session)
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+        if entry is not None and entry.expires > time.time():
+            return self._response(entry)
+
+        headers = []
+        if entry is not None and entry.etag is not None:
+            headers.append(("If-None-Match", entry.etag))
+        if entry is not None and entry.last_modified is not None:
+            headers.append(("If-Modified-Since", entry.last_modified))
+        response = send(headers)
+        if response.status == 304 and entry is not None:
+            response.body.close()
+            entry.expires = time.time() + ttl
+            return self._response(entry)
+        body = response.body.read()
+        entry = record({
+            'status': response.status, 'reason': response.reason,
+            'headers': response.headers, 'body': body,
+            'etag': _header(response.headers, "etag"),
+            'last_modified': _header(response.headers, "last-modified"),
+            'expires': time.time() + ttl})
+        if response.status == 200:
+            self._store(key, entry, generation)
+        return self._response(entry)
+
+    def _response(self, entry):
+        return record({
+            'status': entry.status, 'reason': entry.reason,
+            'headers': entry.headers,
+            'body': ResponseReader(StringIO(entry.body))})
+
+    def _store(self, key, entry, generation):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                # Something was written while the response was in flight.
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old.body)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._size -= len(old.body)
+
+    def invalidate(self, prefix):
+        """Drops the cached responses of the endpoints under *prefix*.
+
+        :param prefix: A path without its namespace, such as ``"apps/local"``.
+        :type prefix: ``string``
+        """
+        with self._lock:
+            self._generation += 1
+            for key in self._entries.keys():
+                if _under(_endpoint_path(_spliturl(key[0])[3]), prefix):
+                    self._size -= len(self._entries.pop(key).body)
+
+    def clear(self):
+        """Drops all cached responses."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._size = 0
+
 # Given an HTTP request handler, this wrapper objects provides a related
 # family of convenience methods built using that handler.
 class HttpLib(object):
@@ -981,7 +2387,8 @@ class HttpLib(object):
         - headers: A list of pairs specifying the HTTP headers (for example: ``[('key': value), ...]``).
 
         - body: A string containing the body to send with the request (this string
-          should default to '').
+          should default to ''). The default handler also accepts a file-like
+          object or an iterable of strings, which it streams to the server.
 
     and ``response_dict`` is a dictionary with the following keys:
 
@@ -994,12 +2401,50 @@ class HttpLib(object):
         - body: A stream-like object supporting ``read(size=None)`` and ``close()``
           methods to get the body of the response.
 
+        - timings: A dictionary with the durations, in seconds, of the
+          ``dns``, ``connect``, ``tls``, and ``first_byte`` phases of the
+          request, and the number of ``bytes_sent`` (optional).
+
     The response dictionary is returned directly by ``HttpLib``'s methods with
     no further processing. By default, ``HttpLib`` calls the :func:`handler` function
     to get a handler function.
+
+    If a :class:`RetryPolicy` is given, failed requests are retried as it
+    allows.
+
+    If an *instrument* function is given, it is called with a record for
+    every request once the body of its response has been read to the end or
+    closed, or once the request has failed. The record has the following
+    fields:
+
+        - method, path: The HTTP method and the path of the URL, without its
+          query.
+
+        - status: The HTTP status of the response, or "None" if there was none.
+
+        - error: The exception that the request raised, or "None".
+
+        - retries: The number of times the request was retried.
+
+        - bytes_sent, bytes_received: The size of the request body and the
+          number of bytes read from the wire for the response body.
+
+        - dns, connect, tls, first_byte, read: The time, in seconds, spent
+          resolving the host name, opening the connection, doing the SSL
+          handshake, waiting for the response after sending the request, and
+          reading the response body. These are "None" for phases that did not
+          happen (such as opening a connection when a pooled one is reused) or
+          that the handler does not report.
+
+        - total: The time, in seconds, from the start of the request,
+          including any retries, to the end of the response body.
     """
-    def __init__(self, custom_handler=None):
+    def __init__(self, custom_handler=None, retry=None, instrument=None,
+                 limit=None):
         self.handler = handler() if custom_handler is None else custom_handler
+        self.retry = retry
+        self.instrument = instrument
+        self.limit = limit
 
     def delete(self, url, headers=None, **kwargs):
         """Sends a DELETE request to a URL.
@@ -1065,7 +2510,8 @@ class HttpLib(object):
         :type headers: ``list``
         :param kwargs: Additional keyword arguments (optional). If the argument
             is ``body``, the value is used as the body for the request, and the
-            keywords and their arguments will be URL encoded. If there is no
+            keywords and their arguments will be URL encoded. The body can be
+            a string, a file-like object, or an iterable of strings. If there is no
             ``body`` keyword argument, all the keyword arguments are encoded
             into the body of the request in the format ``x-www-form-urlencoded``.
         :type kwargs: ``dict``
@@ -1105,13 +2551,92 @@ class HttpLib(object):
             its structure).
         :rtype: ``dict``
         """
-        response = self.handler(url, message, **kwargs)
+        start = time.time()
+        attempts = []
+        def send(url, message):
+            attempts.append(url)
+            return self.send(url, message, **kwargs)
+        try:
+            if self.retry is None:
+                response = send(url, message)
+            else:
+                response = self.retry.request(send, url, message)
+        except Exception:
+            error = sys.exc_info()
+            if self.instrument is not None:
+                self._observe(url, message, start, len(attempts), error=error[1])
+            raise error[0], error[1], error[2]
+        logging.debug("Operation took %.3f seconds", time.time() - start)
+        if self.instrument is not None:
+            self._observe(url, message, start, len(attempts), response=response)
+        return response
+
+    # Reports the record of a request to the instrument function, as soon as
+    # the body of its response is finished.
+    def _observe(self, url, message, start, attempts, response=None, error=None):
+        received = time.time()
+        timings = {} if response is None else response.get('timings') or {}
+        stats = record({
+            'method': message.get('method', "GET"),
+            'path': _spliturl(url)[3].split('?', 1)[0],
+            'status': getattr(response if error is None else error, 'status', None),
+            'error': error,
+            'retries': max(0, attempts - 1),
+            'bytes_sent': timings.get('bytes_sent'),
+            'bytes_received': None,
+            'dns': timings.get('dns'),
+            'connect': timings.get('connect'),
+            'tls': timings.get('tls'),
+            'first_byte': timings.get('first_byte'),
+            'read': None,
+            'total': received - start,
+        })
+        body = None if response is None else response.body
+        if not isinstance(body, ResponseReader):
+            self.instrument(stats)
+            return
+        def finish(bytes_received):
+            now = time.time()
+            stats['read'] = now - received
+            stats['total'] = now - start
+            stats['bytes_received'] = bytes_received
+            self.instrument(stats)
+        body._add_observer(finish)
+
+    def send(self, url, message, **kwargs):
+        """Issues an HTTP request to a URL exactly once, without retrying.
+
+        The parameters and return value are the same as for :meth:`request`.
+        """
+        if self.limit is None:
+            response = self.handler(url, message, **kwargs)
+        else:
+            key = _spliturl(url)[:3]
+            self.limit._acquire(key)
+            try:
+                response = self.handler(url, message, **kwargs)
+            finally:
+                self.limit._release(key)
         response = record(response)
         if 400 <= response.status:
             raise HTTPError(response)
         return response
 
 
+# Size of the compressed chunks read from the wire when decompressing.
+_DECOMPRESS_CHUNK_SIZE = 16 * 1024
+
+# Returns a zlib decompressor for the given Content-Encoding header value, or
+# None if the body is not compressed.
+def _decompressor(content_encoding):
+    if content_encoding is None:
+        return None
+    if content_encoding.strip().lower() in ("gzip", "x-gzip", "deflate"):
+        # Adding 32 to the window size has zlib detect the gzip or zlib
+        # header by itself.
+        return zlib.decompressobj(32 + zlib.MAX_WBITS)
+    return None
+
 # Converts an httplib response into a file-like object.
 class ResponseReader(io.RawIOBase):
     """This class provides a file-like interface for :class:`httplib` responses.
@@ -1119,13 +2644,37 @@ class ResponseReader(io.RawIOBase):
     The ``ResponseReader`` class is intended to be a layer to unify the different
     types of HTTP libraries used with this SDK. This class also provides a
     preview of the stream and a few useful predicates.
+
+    ``ResponseReader`` is a raw I/O stream, so you can wrap it in an
+    ``io.BufferedReader`` to read large responses in big chunks. Its
+    :meth:`readinto` method fills the caller's buffer directly, without an
+    intermediate string, when the underlying response supports ``readinto``.
+
+    If *release* is given, it is called exactly once, with a ``boolean``
+    indicating whether the underlying connection can be reused, as soon as
+    the response has been read to the end or closed. Pooling handlers use it
+    to return keep-alive connections to their pool.
+
+    If *content_encoding* is "gzip" or "deflate", the body is decompressed
+    incrementally as it is read, so :meth:`read`, :meth:`peek`, and
+    :meth:`readinto` all return decompressed data.
     """
     # For testing, you can use a StringIO as the argument to
     # ``ResponseReader`` instead of an ``httplib.HTTPResponse``. It
     # will work equally well.
-    def __init__(self, response):
+    def __init__(self, response, release=None, content_encoding=None):
         self._response = response
-        self._buffer = ''
+        self._decompressor = _decompressor(content_encoding)
+        self._flushed = ''
+        # Characters that were peeked at but not read yet.
+        self._buffer = bytearray()
+        # Number of bytes read from the response itself.
+        self._received = 0
+        # Functions to call, with the number of bytes received, once the
+        # response has been read to the end or closed.
+        self._observers = []
+        self._release = release
+        self._finished = False
 
     def __str__(self):
         return self.read()
@@ -1144,13 +2693,41 @@ class ResponseReader(io.RawIOBase):
         :param size: The number of characters to retrieve.
         :type size: ``integer``
         """
-        c = self.read(size)
-        self._buffer = self._buffer + c
-        return c
+        missing = size - len(self._buffer)
+        if missing > 0:
+            self._buffer.extend(self._read_raw(missing))
+        return str(self._buffer[:size])
 
     def close(self):
         """Closes this response."""
-        self._response.close()
+        if not self._finished:
+            # A response closed before it was read to the end leaves
+            # unread bytes on the wire, so its connection is discarded.
+            reusable = self._at_end()
+            self._response.close()
+            self._finish(reusable)
+        else:
+            self._response.close()
+        io.RawIOBase.close(self)
+
+    def _add_observer(self, observer):
+        if self._finished:
+            observer(self._received)
+        else:
+            self._observers.append(observer)
+
+    def _at_end(self):
+        isclosed = getattr(self._response, "isclosed", None)
+        return isclosed is not None and isclosed()
+
+    def _finish(self, reusable):
+        self._finished = True
+        release, self._release = self._release, None
+        if release is not None:
+            release(reusable)
+        observers, self._observers = self._observers, []
+        for observer in observers:
+            observer(self._received)
 
     def read(self, size = None):
         """Reads a given number of characters from the response.
@@ -1160,13 +2737,57 @@ class ResponseReader(io.RawIOBase):
         :type size: ``integer`` or "None"
 
         """
-        r = self._buffer
-        self._buffer = ''
-        if size is not None:
-            size -= len(r)
-        r = r + self._response.read(size)
+        buffered = len(self._buffer)
+        if buffered == 0:
+            return self._read_raw(size)
+        if size is not None and size <= buffered:
+            r = str(self._buffer[:size])
+            del self._buffer[:size]
+            return r
+        r = str(self._buffer)
+        del self._buffer[:]
+        return r + self._read_raw(None if size is None else size - buffered)
+
+    # Reads from the response itself, bypassing the peek buffer.
+    def _read_raw(self, size):
+        if self._decompressor is None:
+            r = self._response.read(size)
+            self._received += len(r)
+        else:
+            r = self._decompress(size)
+        self._check_finished(size is None or (size > 0 and r == ''))
         return r
 
+    def _check_finished(self, at_end=False):
+        if not self._finished and (at_end or self._at_end()):
+            self._finish(True)
+
+    def _decompress(self, size):
+        # Decompresses at most *size* characters, reading from the wire
+        # only once the decompressor has consumed all its input.
+        decompressor = self._decompressor
+        chunks = []
+        length = 0
+        while size is None or length < size:
+            limit = 0 if size is None else size - length
+            if self._flushed:
+                data = self._flushed if size is None else self._flushed[:limit]
+                self._flushed = self._flushed[len(data):]
+            else:
+                data = decompressor.unconsumed_tail
+                if not data:
+                    data = self._response.read(_DECOMPRESS_CHUNK_SIZE)
+                    self._received += len(data)
+                    if not data:
+                        self._flushed = decompressor.flush()
+                        if not self._flushed:
+                            break
+                        continue
+                data = decompressor.decompress(data, limit)
+            chunks.append(data)
+            length += len(data)
+        return ''.join(chunks)
+
     def readable(self):
         """ Indicates that the response reader is readable."""
         return True
@@ -1179,23 +2800,266 @@ class ResponseReader(io.RawIOBase):
 
         """
         max_size = len(byte_array)
-        data = self.read(max_size)
-        bytes_read = len(data)
-        byte_array[:bytes_read] = data
+        bytes_read = min(max_size, len(self._buffer))
+        if bytes_read > 0:
+            byte_array[:bytes_read] = self._buffer[:bytes_read]
+            del self._buffer[:bytes_read]
+        if bytes_read == max_size:
+            return bytes_read
+        readinto = getattr(self._response, "readinto", None)
+        if self._decompressor is None and readinto is not None:
+            received = readinto(memoryview(byte_array)[bytes_read:]) or 0
+            self._received += received
+            bytes_read += received
+            self._check_finished(received == 0)
+        else:
+            data = self._read_raw(max_size - bytes_read)
+            byte_array[bytes_read:bytes_read + len(data)] = data
+            bytes_read += len(data)
         return bytes_read
 
 
-def handler(key_file=None, cert_file=None, timeout=None):
+class _ConnectionPool(object):
+    """A pool of idle keep-alive connections, keyed by ``(scheme, host, port)``.
+
+    At most *max_size* idle connections are kept for each key; connections
+    checked in beyond that are closed. Idle connections older than
+    *idle_timeout* seconds are closed instead of being reused, since splunkd
+    will most likely have dropped them already. The pool never blocks: when
+    no idle connection is available, a new one is opened with *connect*.
+    """
+    def __init__(self, connect, max_size, idle_timeout):
+        self._connect = connect
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def checkout(self, key):
+        """Returns a pair ``(connection, reused)`` for *key*."""
+        stale = []
+        now = time.time()
+        try:
+            with self._lock:
+                idle = self._idle.get(key, [])
+                while idle:
+                    connection, last_used = idle.pop()
+                    if now - last_used < self._idle_timeout:
+                        return connection, True
+                    stale.append(connection)
+        finally:
+            for connection in stale:
+                connection.close()
+        return self._connect(*key), False
+
+    def checkin(self, key, connection):
+        """Returns *connection* to the pool, or closes it if the pool is full."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self._max_size:
+                idle.append((connection, time.time()))
+                return
+        connection.close()
+
+    def clear(self):
+        """Closes all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.itervalues():
+            for connection, _ in connections:
+                connection.close()
+
+
+# Methods that can safely be sent again if a pooled connection turns out to
+# have been dropped by the server.
+_IDEMPOTENT_METHODS = ("GET", "HEAD", "DELETE")
+
+# Socket errors that show a kept-alive connection was dropped by the server
+# while it sat idle in the pool.
+_STALE_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.EPIPE)
+
+def _stale(error):
+    """Returns whether *error*, raised while sending a request on a reused
+    connection, shows that the server had closed the connection before any
+    of the response arrived."""
+    if isinstance(error, httplib.CannotSendRequest):
+        return True
+    if isinstance(error, httplib.BadStatusLine):
+        # Depending on the Python version, httplib reports that no status
+        # line arrived as "", as "''", or with a message.
+        return error.line in ("", "''") or \
+            error.line.startswith("No status line received")
+    if isinstance(error, socket.timeout):
+        return False
+    return isinstance(error, socket.error) and \
+        getattr(error, "errno", None) in _STALE_CONNECTION_ERRNOS
+
+
+# Size of the blocks read from file-like request bodies.
+_BODY_BLOCK_SIZE = 64 * 1024
+
+# Returns an iterator over the chunks of a streamed request body, which is
+# either a file-like object or an iterable of strings.
+def _body_chunks(body):
+    if hasattr(body, "read"):
+        return iter(lambda: body.read(_BODY_BLOCK_SIZE), "")
+    return iter(body)
+
+# Sends a request whose body is streamed rather than given as a string. The
+# body is sent as is if the caller supplied its Content-Length, and with
+# chunked transfer encoding otherwise. Returns the size of the body.
+def _send_streaming(connection, method, path, body, head):
+    chunked = head.get("Transfer-Encoding") == "chunked"
+    connection.putrequest(method, path, skip_host=True, skip_accept_encoding=True)
+    for key, value in head.iteritems():
+        connection.putheader(key, value)
+    connection.endheaders()
+    sent = 0
+    for chunk in _body_chunks(body):
+        if not chunk:
+            continue
+        sent += len(chunk)
+        if chunked:
+            chunk = "%x\r\n%s\r\n" % (len(chunk), chunk)
+        connection.send(chunk)
+    if chunked:
+        connection.send("0\r\n\r\n")
+    return sent
+
+# Opens the socket of an httplib connection, recording in *timings* how long
+# resolving the host name, connecting, and the SSL handshake took.
+def _open_connection(connection, timings):
+    start = time.time()
+    addresses = socket.getaddrinfo(connection.host, connection.port,
+                                   0, socket.SOCK_STREAM)
+    resolved = time.time()
+    sock = None
+    error = socket.error("getaddrinfo returned an empty list")
+    for family, socktype, proto, _, address in addresses:
+        sock = socket.socket(family, socktype, proto)
+        try:
+            if connection.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(connection.timeout)
+            sock.connect(address)
+            break
+        except socket.error as e:
+            error = e
+            sock.close()
+            sock = None
+    if sock is None:
+        raise error
+    connected = time.time()
+    if isinstance(connection, httplib.HTTPSConnection):
+        context = getattr(connection, "_context", None)
+        if context is not None: # Python 2.7.9+
+            sock = context.wrap_socket(sock, server_hostname=connection.host)
+        else:
+            sock = ssl.wrap_socket(sock, connection.key_file, connection.cert_file)
+        timings['tls'] = time.time() - connected
+    timings['dns'] = resolved - start
+    timings['connect'] = connected - resolved
+    connection.sock = sock
+
+
+# The SSL contexts built by _ssl_context, keyed by their options.
+_ssl_contexts = {}
+_ssl_contexts_lock = threading.Lock()
+
+def _ssl_context(key_file, cert_file, verify, ca_file):
+    """Returns the ``SSLContext`` shared by the HTTPS connections made with
+    these options, building it the first time, or ``None`` before Python
+    2.7.9."""
+    if verify is None:
+        # Python verifies certificates when a client certificate is given.
+        verify = cert_file is not None or key_file is not None
+    if not hasattr(ssl, "create_default_context"):
+        if verify or ca_file is not None:
+            raise ValueError("Verifying certificates requires Python 2.7.9 or later.")
+        return None
+    key = (key_file, cert_file, verify, ca_file)
+    with _ssl_contexts_lock:
+        context = _ssl_contexts.get(key)
+        if context is None:
+            if verify:
+                context = ssl.create_default_context(cafile=ca_file)
+            else:
+                # Nothing is verified, so the CA certificates aren't loaded.
+                # This also turns off SSLv2 and SSLv3, which a bare
+                # SSLContext leaves on before Python 2.7.13.
+                context = ssl._create_unverified_context()
+            if cert_file is not None or key_file is not None:
+                context.load_cert_chain(cert_file, key_file)
+            _ssl_contexts[key] = context
+        return context
+
+
+def handler(key_file=None, cert_file=None, timeout=None, pool_size=None,
+            idle_timeout=60, compress=False, verify=None, ca_file=None):
     """This class returns an instance of the default HTTP request handler using
     the values you provide.
 
+    By default, the handler opens a new connection for every request. If you
+    provide *pool_size*, the handler instead keeps connections alive between
+    requests, holding up to *pool_size* idle connections for each scheme, host,
+    and port. A connection goes back to the pool once the body of its response
+    has been read to the end or closed, so read or close every response you get.
+    If splunkd has closed a pooled connection, ``GET``, ``HEAD``, and
+    ``DELETE`` requests are sent again on a new connection; other requests
+    fail, since they may already have been carried out.
+
+    A request body can be a string, a file-like object, or an iterable of
+    strings. Bodies that are not strings are streamed: they are sent with
+    chunked transfer encoding, unless you supply a ``Content-Length`` header.
+
+    If *compress* is ``True``, the handler asks splunkd to compress response
+    bodies, and decompresses them as they are read. This mostly pays off for
+    large search results and exports over slow links.
+
+    All HTTPS connections made with the same certificate options share one
+    SSL context, built on the first connection, so the client certificate
+    and the CA bundle are loaded once rather than for every connection.
+    Certificates are only verified if *verify* is ``True``, or by default
+    when you provide a client certificate, since splunkd ships with a
+    self-signed certificate.
+
     :param `key_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing your private key (optional).
     :type key_file: ``string``
     :param `cert_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing a certificate chain file (optional).
     :type cert_file: ``string``
     :param `timeout`: The request time-out period, in seconds (optional).
     :type timeout: ``integer`` or "None"
+    :param `pool_size`: The maximum number of idle keep-alive connections to
+        keep for each scheme, host, and port (optional; by default connections
+        are not reused).
+    :type pool_size: ``integer`` or "None"
+    :param `idle_timeout`: The number of seconds after which an idle pooled
+        connection is closed instead of reused (the default is 60).
+    :type idle_timeout: ``integer``
+    :param `compress`: Whether to request gzip-compressed responses (the
+        default is ``False``).
+    :type compress: ``boolean``
+    :param `verify`: Whether to verify the server's certificate and host name
+        (optional; the default is to verify only when *key_file* or
+        *cert_file* is given).
+    :type verify: ``boolean``
+    :param `ca_file`: A path to a PEM formatted file of the certificate
+        authorities to trust when verifying (optional; the default is the
+        system's).
+    :type ca_file: ``string``
+
+    **Example**::
+
+        import splunklib.binding as binding
+        c = binding.connect(handler=binding.handler(pool_size=4), ...)
+        # Or to verify splunkd's certificate
+        c = binding.connect(handler=binding.handler(verify=True,
+                                                    ca_file="splunk-ca.pem"), ...)
     """
+    if verify is None:
+        verify = cert_file is not None or key_file is not None
+    if (verify or ca_file is not None) and \
+            not hasattr(ssl, "create_default_context"):
+        raise ValueError("Verifying certificates requires Python 2.7.9 or later.")
 
     def connect(scheme, host, port):
         kwargs = {}
@@ -1203,42 +3067,100 @@ def handler(key_file=None, cert_file=None, timeout=None):
         if scheme == "http":
             return httplib.HTTPConnection(host, port, **kwargs)
         if scheme == "https":
-            if key_file is not None: kwargs['key_file'] = key_file
-            if cert_file is not None: kwargs['cert_file'] = cert_file
-
-            # If running Python 2.7.9+, disable SSL certificate validation
-            if sys.version_info >= (2,7,9) and key_file is None and cert_file is None:
-                kwargs['context'] = ssl._create_unverified_context()
+            ssl_context = _ssl_context(key_file, cert_file, verify, ca_file)
+            if ssl_context is not None: # Python 2.7.9+
+                kwargs['context'] = ssl_context
+            else:
+                if key_file is not None: kwargs['key_file'] = key_file
+                if cert_file is not None: kwargs['cert_file'] = cert_file
             return httplib.HTTPSConnection(host, port, **kwargs)
         raise ValueError("unsupported scheme: %s" % scheme)
 
+    pool = None if pool_size is None else \
+        _ConnectionPool(connect, pool_size, idle_timeout)
+
+    def send(connection, method, path, body, head, timings):
+        if connection.sock is None:
+            _open_connection(connection, timings)
+        sent = time.time()
+        if isinstance(body, basestring):
+            connection.request(method, path, body, head)
+            timings['bytes_sent'] = len(body)
+        else:
+            timings['bytes_sent'] = _send_streaming(connection, method, path, body, head)
+        if timeout is not None:
+            connection.sock.settimeout(timeout)
+        response = connection.getresponse()
+        timings['first_byte'] = time.time() - sent
+        return response
+
     def request(url, message, **kwargs):
         scheme, host, port, path = _spliturl(url)
         body = message.get("body", "")
+        streaming = not isinstance(body, basestring)
         head = {
-            "Content-Length": str(len(body)),
             "Host": host,
             "User-Agent": "splunk-sdk-python/0.1",
             "Accept": "*/*",
         } # defaults
+        if pool is None:
+            # The connection is closed as soon as the response arrives,
+            # which would also close a kept-alive response before its body
+            # was read.
+            head["Connection"] = "Close"
+        if compress:
+            head["Accept-Encoding"] = "gzip, deflate"
+        if not streaming:
+            head["Content-Length"] = str(len(body))
         for key, value in message["headers"]:
             head[key] = value
+        if streaming and "content-length" not in [k.lower() for k in head]:
+            head["Transfer-Encoding"] = "chunked"
         method = message.get("method", "GET")
+        timings = {}
+
+        if pool is None:
+            connection = connect(scheme, host, port)
+            try:
+                response = send(connection, method, path, body, head, timings)
+            finally:
+                connection.close()
+            release = None
+        else:
+            key = (scheme, host, port)
+            connection, reused = pool.checkout(key)
+            try:
+                try:
+                    response = send(connection, method, path, body, head, timings)
+                except Exception as e:
+                    # A streamed body can't be sent a second time, and any
+                    # other request but an idempotent one may have reached
+                    # splunkd already.
+                    if not reused or streaming or \
+                            method not in _IDEMPOTENT_METHODS or not _stale(e):
+                        raise
+                    # The server closed the idle connection; retry once on
+                    # a fresh one.
+                    connection.close()
+                    connection = connect(scheme, host, port)
+                    response = send(connection, method, path, body, head, timings)
+            except:
+                connection.close()
+                raise
 
-        connection = connect(scheme, host, port)
-        try:
-            connection.request(method, path, body, head)
-            if timeout is not None:
-                connection.sock.settimeout(timeout)
-            response = connection.getresponse()
-        finally:
-            connection.close()
+            def release(reusable):
+                if reusable and not response.will_close:
+                    pool.checkin(key, connection)
+                else:
+                    connection.close()
 
         return {
             "status": response.status,
             "reason": response.reason,
             "headers": response.getheaders(),
-            "body": ResponseReader(response),
+            "body": ResponseReader(response, release,
+                                   response.getheader("content-encoding")),
+            "timings": timings,
         }
 
     return request
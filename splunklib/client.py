@@ -62,14 +62,16 @@ import datetime
 import json
 import urllib
 import logging
-from time import sleep
+from time import sleep, time
 from datetime import datetime, timedelta
 import socket
 import contextlib
+from StringIO import StringIO
 
-from binding import Context, HTTPError, AuthenticationError, namespace, UrlEncoded, _encode
+from binding import Context, HTTPError, AuthenticationError, namespace, UrlEncoded, _encode, _header, _pooled, ResponseReader
 from data import record
 import data
+from results import ResultsReader
 
 __all__ = [
     "connect",
@@ -107,6 +109,7 @@ PATH_STORAGE_PASSWORDS = "storage/passwords"
 XNAMEF_ATOM = "{http://www.w3.org/2005/Atom}%s"
 XNAME_ENTRY = XNAMEF_ATOM % "entry"
 XNAME_CONTENT = XNAMEF_ATOM % "content"
+XNAME_TOTAL_RESULTS = "{http://a9.com/-/spec/opensearch/1.1/}totalResults"
 
 MATCH_ENTRY_CONTENT = "%s/%s/*" % (XNAME_ENTRY, XNAME_CONTENT)
 
@@ -198,6 +201,8 @@ def _load_atom(response, match=None):
 
 # Load an array of atom entries from the body of the given response
 def _load_atom_entries(response):
+    if _is_json(response):
+        return _load_json_entries(response)
     r = _load_atom(response)
     if 'feed' in r:
         # Need this to handle a random case in the REST API
@@ -216,6 +221,87 @@ def _load_atom_entries(response):
         return entries if isinstance(entries, list) else [entries]
 
 
+# Yield the atom entries in the body of the given response, one at a time,
+# while the body is being read. The content of each entry is left unloaded
+# until _parse_atom_entry's state is asked for it.
+def _iter_atom_entries(response):
+    if _is_json(response):
+        return iter(_load_json_entries(response))
+    return data.iterload(response.body, XNAME_ENTRY, defer=[XNAME_CONTENT])
+
+
+# The query arguments that ask splunkd for entity state in the output mode of
+# the given service
+def _state_query(service):
+    if getattr(service, 'output_mode', None) == "json":
+        return {'output_mode': "json"}
+    return {}
+
+
+# Whether the body of the given response is JSON rather than an Atom feed
+def _is_json(response):
+    return 'json' in (_header(response.headers, 'content-type') or '')
+
+
+# Load the entries of a JSON response (output_mode=json) from the body of the
+# given response, converted to the same records as the Atom entries
+def _load_json_entries(response):
+    return [_json_entry(entry)
+            for entry in json.load(response.body).get('entry', [])]
+
+
+# Convert a JSON entry to the record that data.load makes of the equivalent
+# Atom entry, which keeps the access and field metadata in its content
+def _json_entry(entry):
+    content = _json_value(entry.get('content') or {})
+    content['eai:acl'] = _json_value(entry.get('acl'))
+    fields = entry.get('fields') or {}
+    content['eai:attributes'] = record({
+        'requiredFields': _json_value(fields.get('required', [])),
+        'optionalFields': _json_value(fields.get('optional', [])),
+        'wildcardFields': _json_value(fields.get('wildcard', []))})
+    links = entry.get('links') or {}
+    return record({
+        'title': _json_value(entry.get('name')),
+        'link': [record({'rel': rel, 'href': href})
+                 for rel, href in links.iteritems()],
+        'content': content})
+
+
+# Convert a decoded JSON value to what data.load makes of the same value in
+# XML: dicts become records, and scalars become strings, or None if empty
+def _json_value(value):
+    if isinstance(value, dict):
+        return record((data.intern_name(k), _json_value(v))
+                      for k, v in value.iteritems())
+    if isinstance(value, list):
+        return [_json_value(item) for item in value]
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if value is None or value == "":
+        return None
+    if isinstance(value, unicode):
+        try:
+            return value.encode('ascii')
+        except UnicodeError:
+            return value
+    return str(value)
+
+
+# The total number of entities in a collection, as reported by the given
+# page of it with the given body, or None if it is not reported
+def _total_results(response, body):
+    if _is_json(response):
+        total = json.loads(body).get('paging', {}).get('total')
+    else:
+        totals = data.iterload(StringIO(body), XNAME_TOTAL_RESULTS)
+        total = next(totals, None)
+    try:
+        return None if total is None else int(total)
+    except ValueError:
+        return None
+
+
 # Load the sid from the body of the given response
 def _load_sid(response):
     return _load_atom(response).response.sid
@@ -229,8 +315,15 @@ def _parse_atom_entry(entry):
     elink = elink if isinstance(elink, list) else [elink]
     links = record((link.rel, link.href) for link in elink)
 
-    # Retrieve entity content values
-    content = entry.get('content', {})
+    # The access, fields and content are parsed when first read
+    return _EntityState(title, links, entry.get('content', {}))
+
+
+# Parse the access, fields and content of an entity state out of the given
+# atom entry content record
+def _parse_atom_content(content):
+    if isinstance(content, data.Deferred):
+        content = content.load() or {}
 
     # Host entry metadata
     metadata = _parse_atom_metadata(content)
@@ -239,13 +332,73 @@ def _parse_atom_entry(entry):
     content = record((k, v) for k, v in content.iteritems()
         if k not in ['eai:acl', 'eai:attributes', 'type'])
 
-    return record({
-        'title': title,
-        'links': links,
+    return {
         'access': metadata.access,
         'fields': metadata.fields,
         'content': content
-    })
+    }
+
+
+class _EntityState(data.Record):
+    """The state record of an entity, as made by :func:`_parse_atom_entry`.
+
+    The title and links are parsed at once. The access, fields and content,
+    which make up most of an entry, are parsed the first time any of them,
+    or the record as a whole, is read, so that listing the names of a large
+    collection does not parse the content of every entry.
+
+    C code that copies a dict, such as ``dict(state)``, ``d.update(state)``
+    and ``f(**state)``, reads its storage directly and would miss the keys
+    that are not parsed yet, so :attr:`Entity.state` parses the record in
+    full before handing it out.
+    """
+    __slots__ = ('_entry_content',)
+
+    _lazy = ('access', 'fields', 'content')
+
+    def __init__(self, title, links, content):
+        data.Record.__init__(self, title=title, links=links)
+        object.__setattr__(self, '_entry_content', content)
+
+    def _parse(self):
+        content = self._entry_content
+        if content is None: return
+        dict.update(self, _parse_atom_content(content))
+        object.__setattr__(self, '_entry_content', None)
+
+    def __missing__(self, key):
+        if key in self._lazy: self._parse()
+        if dict.__contains__(self, key): return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __eq__(self, other):
+        self._parse()
+        if isinstance(other, _EntityState): other._parse()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __reduce__(self):
+        self._parse()
+        return (record, (dict(self),))
+
+
+# The dict methods that read or change an _EntityState as a whole parse its
+# content first
+def _parsed(method):
+    def wrapper(self, *args, **kwargs):
+        self._parse()
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+for _name in ['__contains__', '__delitem__', '__iter__', '__len__', '__repr__',
+              '__setitem__', 'clear', 'copy', 'get', 'has_key', 'items',
+              'iteritems', 'iterkeys', 'itervalues', 'keys', 'pop', 'popitem',
+              'setdefault', 'update', 'values']:
+    setattr(_EntityState, _name, _parsed(getattr(dict, _name)))
+del _name
 
 
 # Parse the metadata fields out of the given atom entry content record
@@ -293,6 +446,9 @@ def connect(**kwargs):
     :type username: ``string``
     :param `password`: The password for the Splunk account.
     :type password: ``string``
+    :param `output_mode`: The format in which to fetch the state of entities
+                          and collections: "atom" (the default) or "json".
+    :type output_mode: ``string``
     :return: An initialized :class:`Service` connection.
 
     **Example**::
@@ -351,6 +507,15 @@ class Service(_BaseService):
     :param `password`: The password, which is used to authenticate the Splunk
                        instance.
     :type password: ``string``
+    :param `output_mode`: The format in which to fetch the state of entities
+                          and collections: "atom" (the default) or "json".
+                          JSON is faster to parse; the state is the same
+                          either way.
+    :type output_mode: ``string``
+    :param `input_kinds_ttl`: The number of seconds for which the input kinds
+                              found by :class:`Inputs` are reused before they
+                              are looked up again (the default is 300).
+    :type input_kinds_ttl: ``integer``
     :return: A :class:`Service` instance.
 
     **Example**::
@@ -366,6 +531,11 @@ class Service(_BaseService):
     def __init__(self, **kwargs):
         super(Service, self).__init__(**kwargs)
         self._splunk_version = None
+        self.output_mode = kwargs.get("output_mode", "atom")
+        if self.output_mode not in ("atom", "json"):
+            raise ValueError("Invalid output mode: %s" % self.output_mode)
+        self.input_kinds_ttl = kwargs.get("input_kinds_ttl", 300)
+        self._input_kinds_cache = None
 
     @property
     def apps(self):
@@ -902,6 +1072,14 @@ class Entity(Endpoint):
 
     # Load the entity state record from the given response
     def _load_state(self, response):
+        if _is_json(response):
+            entries = _load_json_entries(response)
+            # The name comes from the state, so the path is given instead.
+            if len(entries) > 1:
+                raise AmbiguousReferenceException("Fetch from server returned multiple entries for %s." % self.path)
+            if not entries:
+                raise ValueError("Fetch from server returned no entries for %s." % self.path)
+            return _parse_atom_entry(entries[0])
         entry = self._load_atom_entry(response)
         return _parse_atom_entry(entry)
 
@@ -979,7 +1157,7 @@ class Entity(Endpoint):
         if state is not None:
             self._state = state
         else:
-            self._state = self.read(self.get())
+            self._state = self.read(self.get(**_state_query(self.service)))
         return self
 
     @property
@@ -1026,7 +1204,9 @@ class Entity(Endpoint):
 
         :return: A ``dict`` with keys and corresponding URLs.
         """
-        return self.state.links
+        # The links and title are read without parsing the rest of the state.
+        if self._state is None: self.refresh()
+        return self._state.links
 
     @property
     def name(self):
@@ -1035,7 +1215,8 @@ class Entity(Endpoint):
         :return: The entity name.
         :rtype: ``string``
         """
-        return self.state.title
+        if self._state is None: self.refresh()
+        return self._state.title
 
     def read(self, response):
         """ Reads the current state of the entity from the server. """
@@ -1060,6 +1241,7 @@ class Entity(Endpoint):
         :return: A ``dict`` containing fields and metadata for the entity.
         """
         if self._state is None: self.refresh()
+        if isinstance(self._state, _EntityState): self._state._parse()
         return self._state
 
     def update(self, **kwargs):
@@ -1177,10 +1359,11 @@ class ReadOnlyCollection(Endpoint):
                 # have to extract values out.
                 key, ns = key
                 key = UrlEncoded(key, encode_slash=True)
-                response = self.get(key, owner=ns.owner, app=ns.app)
+                response = self.get(key, owner=ns.owner, app=ns.app,
+                                    **_state_query(self.service))
             else:
                 key = UrlEncoded(key, encode_slash=True)
-                response = self.get(key)
+                response = self.get(key, **_state_query(self.service))
             entries = self._load_list(response)
             if len(entries) > 1:
                 raise AmbiguousReferenceException("Found multiple entities named '%s'; please specify a namespace." % key)
@@ -1282,21 +1465,22 @@ class ReadOnlyCollection(Endpoint):
         that is, an XML document with a toplevel element ``<feed>``,
         and within that element one or more ``<entry>`` elements.
         """
+        return list(self._iter_list(response))
+
+    def _iter_list(self, response):
+        """Converts *response* to entities, like :meth:`_load_list`, but
+        yields each entity as soon as its entry has been read from the
+        body of *response*.
+        """
         # Some subclasses of Collection have to override this because
         # splunkd returns something that doesn't match
         # <feed><entry></entry><feed>.
-        entries = _load_atom_entries(response)
-        if entries is None: return []
-        entities = []
-        for entry in entries:
+        for entry in _iter_atom_entries(response):
             state = _parse_atom_entry(entry)
-            entity = self.item(
+            yield self.item(
                 self.service,
                 self._entity_path(state),
                 state=state)
-            entities.append(entity)
-
-        return entities
 
     def itemmeta(self):
         """Returns metadata for members of the collection.
@@ -1337,19 +1521,34 @@ class ReadOnlyCollection(Endpoint):
         content = _load_atom(response, MATCH_ENTRY_CONTENT)
         return _parse_atom_metadata(content)
 
-    def iter(self, offset=0, count=None, pagesize=None, **kwargs):
+    def iter(self, offset=0, count=None, pagesize=None, prefetch=0, **kwargs):
         """Iterates over the collection.
 
         This method is equivalent to the :meth:`list` method, but
         it returns an iterator and can load a certain number of entities at a
         time from the server.
 
+        Entities are parsed from the response as it arrives, and each one is
+        yielded as soon as its entry has been read, so memory use does not
+        grow with the number of entities in a page.
+
+        With *pagesize* and *prefetch*, the pages after the first are fetched
+        by background threads while the current page is read, with up to
+        *prefetch* pages in flight or waiting at a time. Their offsets come
+        from the total number of entities that the first page reports. Pass
+        the service a pooling handler (see :func:`splunklib.binding.handler`)
+        with a *pool_size* of at least *prefetch* to reuse connections.
+
         :param offset: The index of the first entity to return (optional).
         :type offset: ``integer``
         :param count: The maximum number of entities to return (optional).
         :type count: ``integer``
         :param pagesize: The number of entities to load (optional).
         :type pagesize: ``integer``
+        :param prefetch: The number of pages to fetch ahead of the current one
+            (optional; the default is 0, which fetches each page only once
+            the previous one has been read).
+        :type prefetch: ``integer``
         :param kwargs: Additional arguments (optional):
 
             - "search" (``string``): The search query to filter responses.
@@ -1374,21 +1573,86 @@ class ReadOnlyCollection(Endpoint):
                 ...
         """
         assert pagesize is None or pagesize > 0
+        assert prefetch >= 0
         if count is None:
             count = self.null_count
+        kwargs = dict(_state_query(self.service), **kwargs)
+        if pagesize is not None and prefetch > 0:
+            for item in self._iter_prefetched(offset, count, pagesize,
+                                              prefetch, kwargs):
+                yield item
+            return
         fetched = 0
         while count == self.null_count or fetched < count:
             response = self.get(count=pagesize or count, offset=offset, **kwargs)
-            items = self._load_list(response)
-            N = len(items)
+            N = 0
+            try:
+                for item in self._iter_list(response):
+                    N += 1
+                    yield item
+            finally:
+                response.body.close()
             fetched += N
-            for item in items:
-                yield item
             if pagesize is None or N < pagesize:
                 break
             offset += N
             logging.debug("pagesize=%d, fetched=%d, offset=%d, N=%d, kwargs=%s", pagesize, fetched, offset, N, kwargs)
 
+    def _iter_prefetched(self, offset, count, pagesize, prefetch, kwargs):
+        """Iterates over the collection like :meth:`iter`, fetching up to
+        *prefetch* pages at once after the first.
+        """
+        def entities(response):
+            try:
+                for item in self._iter_list(response):
+                    yield item
+            finally:
+                response.body.close()
+
+        response = self.get(count=pagesize if count == self.null_count
+                            else min(pagesize, count), offset=offset, **kwargs)
+        body = response.body.read()
+        total = _total_results(response, body)
+        response = record(dict(response, body=ResponseReader(StringIO(body))))
+        if total is None:
+            # The total is needed to plan the pages, so without it the
+            # remaining pages are fetched one at a time.
+            fetched = 0
+            for item in entities(response):
+                fetched += 1
+                yield item
+            if fetched < pagesize: return
+            if count != self.null_count:
+                count -= fetched
+                if count <= 0: return
+            for item in ReadOnlyCollection.iter(self, offset + fetched, count,
+                                                pagesize, **kwargs):
+                yield item
+            return
+
+        for item in entities(response):
+            yield item
+        end = total if count == self.null_count else min(total, offset + count)
+        owner, app, sharing = [kwargs.get(key) for key in
+                               ('owner', 'app', 'sharing')]
+        path = self.service._abspath(self.path, owner=owner, app=app,
+                                     sharing=sharing)
+        requests = [("GET", path, dict(kwargs, offset=start,
+                                       count=min(pagesize, end - start)))
+                    for start in range(offset + pagesize, end, pagesize)]
+        results = self.service.batch(requests, max_workers=prefetch,
+                                     lookahead=prefetch)
+        try:
+            for result in results:
+                if result.error is not None:
+                    # Keeps the traceback of the thread that fetched the page.
+                    info = result.exc_info
+                    raise info[0], info[1], info[2]
+                for item in entities(result.response):
+                    yield item
+        finally:
+            results.close()
+
     # kwargs: count, offset, search, sort_dir, sort_key, sort_mode
     def list(self, count=None, **kwargs):
         """Retrieves a list of entities in this collection.
@@ -1396,7 +1660,9 @@ class ReadOnlyCollection(Endpoint):
         The entire collection is loaded at once and is returned as a list. This
         function makes a single roundtrip to the server, plus at most two more if
         the ``autologin`` field of :func:`connect` is set to ``True``.
-        There is no caching--every call makes at least one round trip.
+        Unless the service was created with a response cache (see
+        :class:`splunklib.binding.ResponseCache`), every call makes at least
+        one round trip.
 
         :param count: The maximum number of entities to return (optional).
         :type count: ``integer``
@@ -1466,8 +1732,9 @@ class Collection(ReadOnlyCollection):
     entities in this collection. To view the access control list and other
     metadata of the collection, use the :meth:`ReadOnlyCollection.itemmeta` method.
 
-    :class:`Collection` does no caching. Each call makes at least one
-    round trip to the server to fetch data.
+    :class:`Collection` does no caching of its own. Each call makes at least
+    one round trip to the server to fetch data, unless the service was
+    created with a :class:`splunklib.binding.ResponseCache`.
     """
 
     def create(self, name, **params):
@@ -2005,8 +2272,11 @@ class Index(Entity):
     def submit(self, event, host=None, source=None, sourcetype=None):
         """Submits a single event to the index using ``HTTP POST``.
 
+        The event can also be a file object or an iterable of strings, in
+        which case it is streamed to the server as it is read.
+
         :param event: The event to submit.
-        :type event: ``string``
+        :type event: ``string``, file object, or iterable of ``string``s
         :param `host`: The host value of the event.
         :type host: ``string``
         :param `source`: The source value of the event.
@@ -2122,11 +2392,23 @@ class Inputs(Collection):
     """This class represents a collection of inputs. The collection is
     heterogeneous and each member of the collection contains a *kind* property
     that indicates the specific type of input.
-    Retrieve this collection using :meth:`Service.inputs`."""
+    Retrieve this collection using :meth:`Service.inputs`.
+
+    Lookups that span several kinds request every kind at once, from up to
+    ``lookup_workers`` threads (the default is 8)."""
+
+    lookup_workers = 8
 
     def __init__(self, service, kindmap=None):
         Collection.__init__(self, service, PATH_INPUTS, item=Input)
 
+    def _get_each(self, segments, **query):
+        # GET each of the path segments relative to this endpoint, from up to
+        # lookup_workers threads at once; the results come in order.
+        requests = [("GET", self.service._abspath(self.path + segment), query)
+                    for segment in segments]
+        return self.service.batch(requests, max_workers=self.lookup_workers)
+
     def __getitem__(self, key):
         # The key needed to retrieve the input needs it's parenthesis to be URL encoded
         # based on the REST API for input
@@ -2150,27 +2432,28 @@ class Inputs(Collection):
                 else:
                     raise
         else:
-            # Iterate over all the kinds looking for matches.
+            # Look for matches of every kind at once.
             kind = None
             candidate = None
             key = UrlEncoded(key, encode_slash=True)
-            for kind in self.kinds:
-                try:
-                    response = self.get(kind + "/" + key)
-                    entries = self._load_list(response)
-                    if len(entries) > 1:
-                        raise AmbiguousReferenceException("Found multiple inputs of kind %s named %s." % (kind, key))
-                    elif len(entries) == 0:
-                        pass
-                    else:
-                        if candidate is not None: # Already found at least one candidate
-                            raise AmbiguousReferenceException("Found multiple inputs named %s, please specify a kind" % key)
-                        candidate = entries[0]
-                except HTTPError as he:
-                    if he.status == 404:
-                        pass # Just carry on to the next kind.
-                    else:
-                        raise
+            kinds = self.kinds
+            results = self._get_each([kind + "/" + key for kind in kinds])
+            for result in results:
+                kind = kinds[result.index]
+                if result.error is not None:
+                    if isinstance(result.error, HTTPError) and result.error.status == 404:
+                        continue # Just carry on to the next kind.
+                    info = result.exc_info
+                    raise info[0], info[1], info[2]
+                entries = self._load_list(result.response)
+                if len(entries) > 1:
+                    raise AmbiguousReferenceException("Found multiple inputs of kind %s named %s." % (kind, key))
+                elif len(entries) == 0:
+                    pass
+                else:
+                    if candidate is not None: # Already found at least one candidate
+                        raise AmbiguousReferenceException("Found multiple inputs named %s, please specify a kind" % key)
+                    candidate = entries[0]
             if candidate is None:
                 raise KeyError(key) # Never found a match.
             else:
@@ -2188,19 +2471,21 @@ class Inputs(Collection):
             # Without a kind, we want to minimize the number of round trips to the server, so we
             # reimplement some of the behavior of __getitem__ in order to be able to stop searching
             # on the first hit.
-            for kind in self.kinds:
-                try:
-                    response = self.get(self.kindpath(kind) + "/" + key)
-                    entries = self._load_list(response)
+            results = self._get_each([self.kindpath(kind) + "/" + key
+                                      for kind in self.kinds])
+            try:
+                for result in results:
+                    if result.error is not None:
+                        if isinstance(result.error, HTTPError) and result.error.status == 404:
+                            continue # Just carry on to the next kind.
+                        info = result.exc_info
+                        raise info[0], info[1], info[2]
+                    entries = self._load_list(result.response)
                     if len(entries) > 0:
                         return True
-                    else:
-                        pass
-                except HTTPError as he:
-                    if he.status == 404:
-                        pass # Just carry on to the next kind.
-                    else:
-                        raise
+            finally:
+                # Kinds not yet requested are not requested at all.
+                results.close()
             return False
 
     def create(self, name, kind, **kwargs):
@@ -2322,7 +2607,7 @@ class Inputs(Collection):
         :return: The metadata.
         :rtype: class:``splunklib.data.Record``
         """
-        response = self.get("%s/_new" % self._kindmap[kind])
+        response = self.get("%s/_new" % self.kindpath(kind))
         content = _load_atom(response, MATCH_ENTRY_CONTENT)
         return _parse_atom_metadata(content)
 
@@ -2347,14 +2632,46 @@ class Inputs(Collection):
                 kinds.extend(subkinds)
         return kinds
 
+    def _input_kinds(self):
+        # The kinds are shared by every Inputs of the service, and looked up
+        # again once they are older than its input_kinds_ttl.
+        found = self.service._input_kinds_cache
+        if found is None or found.expires <= time():
+            found = self.refresh_kinds()
+        return found
+
+    def refresh_kinds(self):
+        """Looks up the input kinds on this Splunk instance again, rather than
+        reusing the ones found earlier by this service.
+
+        :return: A record with the fields ``kinds`` (the list of input kinds),
+            ``paths`` (a ``dict`` from each kind to its path), and
+            ``expires`` (when the kinds are next looked up).
+        :rtype: class:``splunklib.data.Record``
+        """
+        kinds = self._get_kind_list()
+        paths = dict((kind, UrlEncoded(kind, skip_encode=True))
+                     for kind in kinds)
+        # Old names of the TCP kinds
+        paths.setdefault('tcp', UrlEncoded('tcp/raw', skip_encode=True))
+        paths.setdefault('splunktcp', UrlEncoded('tcp/cooked', skip_encode=True))
+        found = record({'kinds': kinds, 'paths': paths,
+                        'expires': time() + self.service.input_kinds_ttl})
+        self.service._input_kinds_cache = found
+        return found
+
     @property
     def kinds(self):
         """Returns the input kinds on this Splunk instance.
 
+        The kinds are looked up once and reused for the ``input_kinds_ttl`` of
+        the service (see :class:`Service`); call :meth:`refresh_kinds` to look
+        them up again.
+
         :return: The list of input kinds.
         :rtype: ``list``
         """
-        return self._get_kind_list()
+        return list(self._input_kinds().kinds)
 
     def kindpath(self, kind):
         """Returns a path to the resources for a given input kind.
@@ -2386,13 +2703,9 @@ class Inputs(Collection):
         :return: The relative endpoint path.
         :rtype: ``string``
         """
-        if kind in self.kinds:
-            return UrlEncoded(kind, skip_encode=True)
-        # Special cases
-        elif kind == 'tcp':
-            return UrlEncoded('tcp/raw', skip_encode=True)
-        elif kind == 'splunktcp':
-            return UrlEncoded('tcp/cooked', skip_encode=True)
+        paths = self._input_kinds().paths
+        if kind in paths:
+            return paths[kind]
         else:
             raise ValueError("No such kind on server: %s" % kind)
 
@@ -2481,18 +2794,19 @@ class Inputs(Collection):
         search = kwargs.get('search', '*')
 
         entities = []
-        for kind in kinds:
-            response = None
-            try:
-                kind = UrlEncoded(kind, skip_encode=True)
-                response = self.get(self.kindpath(kind), search=search)
-            except HTTPError as e:
-                if e.status == 404:
+        kinds = [UrlEncoded(kind, skip_encode=True) for kind in kinds]
+        results = self._get_each([self.kindpath(kind) for kind in kinds],
+                                 search=search)
+        for result in results:
+            kind = kinds[result.index]
+            if result.error is not None:
+                if isinstance(result.error, HTTPError) and result.error.status == 404:
                     continue # No inputs of this kind
                 else:
-                    raise
+                    info = result.exc_info
+                    raise info[0], info[1], info[2]
 
-            entries = _load_atom_entries(response)
+            entries = _load_atom_entries(result.response)
             if entries is None: continue # No inputs to process
             for entry in entries:
                 state = _parse_atom_entry(entry)
@@ -2565,6 +2879,59 @@ class Inputs(Collection):
         self.post('oneshot', name=path, **kwargs)
 
 
+# The shortest delay, in seconds, between two polls of a job's state
+MIN_POLL_INTERVAL = 0.1
+
+# The fields of each job that Jobs.wait_all asks for when it polls
+WAIT_FIELDS = ['sid', 'isDone', 'doneProgress', 'runDuration', 'dispatchState']
+
+# The most jobs that Jobs.wait_all lists in one request, which keeps the
+# length of the URL well under the limits of servers and proxies
+WAIT_CHUNK_SIZE = 25
+
+
+# The progress of a job, from 0 to 1, given its state content
+def _job_progress(content):
+    if content.get('isDone') == '1':
+        return 1.0
+    try:
+        return float(content.get('doneProgress') or 0)
+    except ValueError:
+        return 0.0
+
+
+# The number of seconds to wait before polling a job again, given its state
+# content and the previous delay: half the time that the job still needs,
+# judging by its progress so far, or else longer than the previous delay
+def _poll_delay(content, delay, max_interval):
+    progress = _job_progress(content)
+    try:
+        duration = float(content.get('runDuration') or 0)
+    except ValueError:
+        duration = 0
+    if 0 < progress < 1 and duration > 0:
+        delay = duration * (1 - progress) / progress / 2
+    else:
+        delay = delay * 1.5
+    return min(max(delay, MIN_POLL_INTERVAL), max_interval)
+
+
+# A search term that matches the job with the given sid exactly
+def _sid_term(sid):
+    return 'sid="%s"' % sid.replace('\\', '\\\\').replace('"', '\\"')
+
+
+# The seconds left before the given deadline, raising OperationError for the
+# given jobs if there are none
+def _time_left(deadline, timeout, sids):
+    if deadline is None: return None
+    left = deadline - time()
+    if left <= 0:
+        raise OperationError("Jobs did not finish within %s seconds: %s" %
+                             (timeout, ", ".join(sids)))
+    return left
+
+
 class Job(Entity):
     """This class represents a search job."""
     def __init__(self, service, sid, **kwargs):
@@ -2657,6 +3024,48 @@ class Job(Entity):
         ready = self._state.content['dispatchState'] not in ['QUEUED', 'PARSING']
         return ready
 
+    def wait(self, timeout=None, progress_callback=None, max_interval=5):
+        """Waits for this job to finish.
+
+        The job's state is polled with a delay that adapts to the job: about
+        half the time it still needs, judging by its ``doneProgress`` and
+        ``runDuration``, or a growing delay while it reports no progress.
+        The delay is at most *max_interval* seconds.
+
+        :param timeout: The number of seconds to wait at most (optional; by
+            default, waits until the job is done).
+        :type timeout: ``float``
+        :param progress_callback: A function called after each poll with the
+            job and its progress, from 0 to 1 (optional).
+        :type progress_callback: ``function``
+        :param max_interval: The longest delay in seconds between polls (the
+            default is 5).
+        :type max_interval: ``float``
+
+        :return: The :class:`Job`, with the state it finished with.
+        :raises OperationError: The job did not finish within *timeout*
+            seconds.
+
+        **Example**::
+
+            import splunklib.client as client
+            s = client.connect(...)
+            job = s.jobs.create("search * | head 5")
+            job.wait(timeout=60)
+        """
+        deadline = None if timeout is None else time() + timeout
+        delay = 0
+        while True:
+            done = self.is_done()
+            content = self._state.content if self._state is not None else {}
+            if progress_callback is not None:
+                progress_callback(self, _job_progress(content))
+            if done:
+                return self
+            delay = _poll_delay(content, delay, max_interval)
+            left = _time_left(deadline, timeout, [self.sid])
+            sleep(delay if left is None else min(delay, left))
+
     @property
     def name(self):
         """Returns the name of the search job, which is the search ID (SID).
@@ -2681,11 +3090,9 @@ class Job(Entity):
 
             import splunklib.client as client
             import splunklib.results as results
-            from time import sleep
             service = client.connect(...)
             job = service.jobs.create("search * | head 5")
-            while not job.is_done():
-                sleep(.2)
+            job.wait()
             rr = results.ResultsReader(job.results())
             for result in rr:
                 if isinstance(result, results.Message):
@@ -2713,6 +3120,79 @@ class Job(Entity):
         query_params['segmentation'] = query_params.get('segmentation', 'none')
         return self.get("results", **query_params).body
 
+    def results_parallel(self, fields=None, chunk=50000, workers=4,
+                         ordered=True, **query_params):
+        """Returns an iterator over the rows of this job's results, which are
+        downloaded in ranges of *chunk* rows over up to *workers* connections
+        at once.
+
+        The ranges are planned from the job's ``resultCount``, so the job must
+        be done. Each range is parsed by the thread that downloaded it, and at
+        most *workers* ranges are downloaded or held ahead of the caller. Rows
+        are ``dict``s, as :class:`splunklib.results.ResultsReader` returns
+        them; the diagnostic messages sent with each range are dropped. If a
+        range fails, its error is raised by the iterator, and no more ranges
+        are downloaded. Pass the service a pooling handler (see
+        :func:`splunklib.binding.handler`) with a *pool_size* of at least
+        *workers* to reuse connections.
+
+        :param fields: The fields to return (optional; by default, all).
+        :type fields: ``list``
+        :param chunk: The number of rows in each range (the default is 50000).
+        :type chunk: ``integer``
+        :param workers: The number of ranges to download at once (the default
+            is 4).
+        :type workers: ``integer``
+        :param ordered: Whether rows come in the order of the results, rather
+            than a range at a time as soon as each is parsed (the default is
+            ``True``).
+        :type ordered: ``boolean``
+        :param query_params: Additional parameters (optional), as for
+            :meth:`results`, other than ``offset``, ``count`` and
+            ``output_mode``.
+        :type query_params: ``dict``
+
+        :return: An iterator over the rows.
+        :raises OperationError: The job is not done.
+
+        **Example**::
+
+            import splunklib.client as client
+            service = client.connect(...)
+            job = service.jobs.create("search index=main", exec_mode="blocking")
+            for row in job.results_parallel(fields=["host", "_raw"], workers=8):
+                print row["host"]
+        """
+        assert chunk > 0 and workers > 0
+        self.refresh()
+        if self['isDone'] != '1':
+            raise OperationError("Job %s is not done." % self.sid)
+        total = int(self['resultCount'])
+        query_params['segmentation'] = query_params.get('segmentation', 'none')
+        if fields is not None:
+            query_params['f'] = list(fields)
+
+        def fetch(index, offset):
+            body = self.get("results", offset=offset, count=chunk,
+                            **query_params).body
+            try:
+                return [row for row in ResultsReader(body)
+                        if isinstance(row, dict)]
+            finally:
+                body.close()
+
+        def rows():
+            ranges = _pooled(fetch, range(0, total, chunk), workers, ordered,
+                             lookahead=workers)
+            try:
+                for found in ranges:
+                    for row in found:
+                        yield row
+            finally:
+                ranges.close()
+
+        return rows()
+
     def preview(self, **query_params):
         """Returns a streaming handle to this job's preview search results.
 
@@ -2848,19 +3328,109 @@ class Jobs(Collection):
         # Collection is 0, not -1 as it is on most.
         self.null_count = 0
 
-    def _load_list(self, response):
+    def _iter_list(self, response):
         # Overridden because Job takes a sid instead of a path.
-        entries = _load_atom_entries(response)
-        if entries is None: return []
-        entities = []
-        for entry in entries:
+        for entry in _iter_atom_entries(response):
             state = _parse_atom_entry(entry)
-            entity = self.item(
+            yield self.item(
                 self.service,
-                entry['content']['sid'],
+                state.content['sid'],
                 state=state)
-            entities.append(entity)
-        return entities
+
+    def wait_all(self, jobs, timeout=None, progress_callback=None,
+                 max_interval=5):
+        """Waits for all of the given jobs to finish.
+
+        Each poll lists the jobs that are not done yet, filtered by their
+        search IDs, with only the fields needed to tell how far along each
+        job is (``WAIT_FIELDS``), in one request for every
+        ``WAIT_CHUNK_SIZE`` jobs. The jobs found done are then listed once
+        more, with their full state, which each of them is refreshed with.
+        A job missing from a listing is polled on its own. The delay between
+        polls adapts as in :meth:`Job.wait`, to the job expected to finish
+        first.
+
+        :param jobs: The jobs to wait for.
+        :type jobs: ``list`` of :class:`Job`
+        :param timeout: The number of seconds to wait at most (optional; by
+            default, waits until every job is done).
+        :type timeout: ``float``
+        :param progress_callback: A function called after each poll with each
+            job that was not yet done and its progress, from 0 to 1
+            (optional).
+        :type progress_callback: ``function``
+        :param max_interval: The longest delay in seconds between polls (the
+            default is 5).
+        :type max_interval: ``float``
+
+        :return: The jobs, in the order given.
+        :rtype: ``list`` of :class:`Job`
+        :raises OperationError: Some jobs did not finish within *timeout*
+            seconds.
+
+        **Example**::
+
+            import splunklib.client as client
+            s = client.connect(...)
+            jobs = [s.jobs.create(query) for query in queries]
+            for job in s.jobs.wait_all(jobs, timeout=600):
+                print job.sid, job["resultCount"]
+        """
+        jobs = list(jobs)
+        watched = dict((job.sid, job) for job in jobs)
+        pending = dict(watched)
+        deadline = None if timeout is None else time() + timeout
+        delay = 0
+        while pending:
+            listed = self._list_jobs(sorted(pending), WAIT_FIELDS)
+            delays = []
+            finished = []
+            for sid, job in pending.items():
+                state = listed.get(sid)
+                if state is None:
+                    done = job.is_done()
+                    content = job._state.content if job._state is not None else {}
+                else:
+                    content = state.content
+                    done = content.get('isDone') == '1'
+                    if done: finished.append(sid)
+                if progress_callback is not None:
+                    progress_callback(job, _job_progress(content))
+                if done:
+                    del pending[sid]
+                else:
+                    delays.append(_poll_delay(content, delay, max_interval))
+            # The polls only fetch the progress fields, so the jobs found done
+            # are listed again with their full state.
+            states = self._list_jobs(finished) if finished else {}
+            for sid in finished:
+                if sid in states:
+                    watched[sid].refresh(states[sid])
+                else:
+                    watched[sid].refresh()
+            if not pending:
+                break
+            delay = min(delays)
+            left = _time_left(deadline, timeout, sorted(pending))
+            sleep(delay if left is None else min(delay, left))
+        return jobs
+
+    def _list_jobs(self, sids, fields=None):
+        # List the state of the jobs with the given sids, by sid, with only
+        # the given fields if any, in one request for every WAIT_CHUNK_SIZE
+        # jobs. Jobs missing from the listing are left out.
+        query = _state_query(self.service)
+        if fields is not None:
+            query['f'] = fields
+        listed = {}
+        for start in range(0, len(sids), WAIT_CHUNK_SIZE):
+            chunk = sids[start:start + WAIT_CHUNK_SIZE]
+            response = self.get(search=" OR ".join(_sid_term(sid) for sid in chunk),
+                                count=len(chunk), **query)
+            for entry in _iter_atom_entries(response):
+                state = _parse_atom_entry(entry)
+                listed[state.content['sid']] = state
+        return listed
 
     def create(self, query, **kwargs):
         """ Creates a search using a search query and any additional parameters
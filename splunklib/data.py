@@ -16,9 +16,9 @@
 format, which is the format used by most of the REST API.
 """
 
-from xml.etree.ElementTree import XML
+import etree
 
-__all__ = ["load"]
+__all__ = ["Deferred", "iterload", "load"]
 
 # LNAME refers to element names without namespaces; XNAME is the same
 # name, but with an XML namespace.
@@ -55,6 +55,23 @@ def localname(xname):
     rcurly = xname.find('}')
     return xname if rcurly == -1 else xname[rcurly+1:]
 
+def intern_name(name, nametable=None):
+    """Returns the shared copy of the given key name, so that the records of 
+    many entries don't each hold their own copy of the same names. ASCII 
+    names are interned; other names are shared through *nametable*, if 
+    given.
+    """
+    if isinstance(name, unicode):
+        try:
+            name = name.encode('ascii')
+        except UnicodeError:
+            if nametable is None: return name
+            return nametable['names'].setdefault(name, name)
+    return intern(name)
+
+def new_nametable():
+    return {'namespaces': [], 'names': {}}
+
 def load(text, match=None):
     """This function reads a string that contains the XML of an Atom Feed, then 
     returns the 
@@ -70,11 +87,8 @@ def load(text, match=None):
     if text is None: return None
     text = text.strip()
     if len(text) == 0: return None
-    nametable = {
-        'namespaces': [],
-        'names': {}
-    }
-    root = XML(text)
+    nametable = new_nametable()
+    root = etree.XML(text)
     items = [root] if match is None else root.findall(match)
     count = len(items)
     if count == 0: 
@@ -84,12 +98,63 @@ def load(text, match=None):
     else:
         return [load_root(item, nametable) for item in items]
 
+def iterload(stream, tag, defer=None):
+    """This function reads the XML of an Atom Feed from a file-like object, 
+    and yields the data of each element with the given tag as soon as the 
+    element has been read. Only the root element and its children are 
+    matched, and each element is discarded once its data is loaded, so 
+    memory use does not grow with the size of the feed.
+
+    :param stream: The XML text to load.
+    :type stream: A file-like object
+    :param tag: The tag name, including its namespace, of the elements to 
+        load, such as ``{http://www.w3.org/2005/Atom}entry``.
+    :type tag: ``string``
+    :param defer: The tag names of children of each matched element to 
+        leave unloaded (optional). In the yielded data, the value of each 
+        such child is a :class:`Deferred` that loads it when asked.
+    :type defer: ``list``
+    """
+    nametable = new_nametable()
+    root = None
+    depth = 0
+    try:
+        for event, element in etree.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None: root = element
+                depth += 1
+                continue
+            depth -= 1
+            if depth <= 1 and element.tag == tag:
+                yield load_matched(element, nametable, defer)
+                # Drop everything parsed so far.
+                root.clear()
+    except etree.ParseError:
+        # Like load, treat an empty document as no data.
+        if root is not None: raise
+
+# Load the given element matched by iterload, leaving the children with
+# the given tags unloaded.
+def load_matched(element, nametable, defer):
+    deferred = [child for child in element if child.tag in defer] \
+               if defer else []
+    for child in deferred:
+        element.remove(child)
+    value = load_elem(element, nametable)[1]
+    if len(deferred) == 0: return value
+    if not isinstance(value, dict): 
+        value = record() if value is None else record({"$text": value})
+    for child in deferred:
+        name = intern_name(localname(child.tag), nametable)
+        value[name] = Deferred(child, nametable)
+    return value
+
 # Load the attributes of the given element.
-def load_attrs(element):
+def load_attrs(element, nametable=None):
     if not hasattrs(element): return None
     attrs = record()
     for key, value in element.attrib.iteritems(): 
-        attrs[key] = value
+        attrs[intern_name(key, nametable)] = value
     return attrs
 
 # Parse a <dict> element and return a Python dict
@@ -98,14 +163,14 @@ def load_dict(element, nametable = None):
     children = list(element)
     for child in children:
         assert iskey(child.tag)
-        name = child.attrib["name"]
+        name = intern_name(child.attrib["name"], nametable)
         value[name] = load_value(child, nametable)
     return value
 
 # Loads the given elements attrs & value into single merged dict.
 def load_elem(element, nametable=None):
-    name = localname(element.tag)
-    attrs = load_attrs(element)
+    name = intern_name(localname(element.tag), nametable)
+    attrs = load_attrs(element, nametable)
     value = load_value(element, nametable)
     if attrs is None: return name, value
     if value is None: return name, attrs
@@ -179,6 +244,23 @@ def load_value(element, nametable=None):
 
     return value
 
+class Deferred(object):
+    """This class holds an element read by :func:`iterload` whose data has 
+    not been loaded yet. Call :meth:`load` to load it.
+    """
+    __slots__ = ('element', 'nametable')
+
+    def __init__(self, element, nametable=None):
+        self.element = element
+        self.nametable = nametable
+
+    def load(self):
+        """Loads the data of the element, as :func:`load` would.
+
+        :return: The data of the element.
+        """
+        return load_elem(self.element, self.nametable)[1]
+
 # A generic utility that enables "dot" access to dicts
 class Record(dict):
     """This generic utility class enables dot access to members of a Python 
@@ -198,6 +280,9 @@ class Record(dict):
     one is placed into a nested dictionary, so you can write ``r.bar.qux`` or 
     ``r['bar.qux']`` interchangeably.
     """
+    # Records have no instance __dict__: attributes are keys.
+    __slots__ = ()
+
     sep = '.'
 
     def __call__(self, *args):
@@ -206,7 +291,11 @@ class Record(dict):
 
     def __getattr__(self, name):
         try:
-            return self[name]
+            return dict.__getitem__(self, name)
+        except KeyError:
+            pass
+        try:
+            return self.__getitem__(name)
         except KeyError: 
             raise AttributeError(name)
 
@@ -223,8 +312,10 @@ class Record(dict):
         return result
 
     def __getitem__(self, key):
-        if key in self:
+        try:
             return dict.__getitem__(self, key)
+        except KeyError:
+            pass
         key += self.sep
         result = record()
         for k,v in self.iteritems():
@@ -0,0 +1,166 @@
+# Copyright 2011-2014 Splunk, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"): you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The **splunklib.etree** module chooses the XML parser that the SDK uses
+to read Atom responses from splunkd (:mod:`splunklib.data`), search results
+(:mod:`splunklib.results`), and modular input definitions.
+
+The fastest parser that is installed is used: ``lxml``, then
+``cElementTree``, then the pure Python ``ElementTree``. The name of the
+active parser is in :data:`backend`. Every parser is configured so that the
+SDK reads the same data from a document whichever one is active; to choose
+another one, call :func:`use`::
+
+    import splunklib.etree as etree
+    print etree.backend        # lxml, cElementTree or ElementTree
+    etree.use("ElementTree")
+"""
+
+from xml.parsers.expat import ExpatError
+
+__all__ = ["BACKENDS", "XML", "ParseError", "available", "backend",
+           "iterparse", "parse", "truncated", "use"]
+
+BACKENDS = ["lxml", "cElementTree", "ElementTree"]
+
+# Messages the parsers use for a document that ends before its root
+# element is closed.
+_TRUNCATED = ["no element found", "Document is empty", "Premature end of data"]
+
+# The name of the active parser.
+backend = None
+
+# The exception that the active parser raises for malformed XML. ElementTree
+# and cElementTree only have a ``ParseError`` from Python 2.7 on, and raise
+# ``xml.parsers.expat.ExpatError`` before.
+ParseError = SyntaxError
+
+_impl = None
+
+# The parsers read bytes; text is given to them encoded as UTF-8.
+
+class _ElementTree(object):
+    def __init__(self, module):
+        self.module = module
+        self.ParseError = getattr(module, "ParseError", ExpatError)
+
+    def XML(self, text):
+        if isinstance(text, unicode): text = text.encode('utf-8')
+        return self.module.XML(text)
+
+    def parse(self, source):
+        return self.module.parse(source)
+
+    def iterparse(self, source, events):
+        return self.module.iterparse(source, events=events)
+
+class _Lxml(object):
+    # Comments and processing instructions are dropped, as ElementTree
+    # does, and entities are not resolved, so that no parser reads other
+    # files or the network. libxml2's limits on the depth of documents and
+    # the size of text nodes are kept, since the documents come from the
+    # network.
+    options = {'remove_comments': True, 'remove_pis': True,
+               'resolve_entities': False}
+
+    def __init__(self, module):
+        self.module = module
+        self.ParseError = module.XMLSyntaxError
+
+    # Parsers are not shared between threads, so each call gets its own.
+    def _parser(self):
+        return self.module.XMLParser(**self.options)
+
+    def XML(self, text):
+        if isinstance(text, unicode): text = text.encode('utf-8')
+        return self.module.fromstring(text, self._parser())
+
+    def parse(self, source):
+        return self.module.parse(source, self._parser())
+
+    def iterparse(self, source, events):
+        return self.module.iterparse(source, events=events, **self.options)
+
+def _load(name):
+    if name == "lxml":
+        from lxml import etree as module
+        return _Lxml(module)
+    if name == "cElementTree":
+        import xml.etree.cElementTree as module
+        return _ElementTree(module)
+    if name == "ElementTree":
+        import xml.etree.ElementTree as module
+        return _ElementTree(module)
+    raise ValueError("Unknown XML backend: %s (expected one of %s)" %
+                     (name, ", ".join(BACKENDS)))
+
+def available():
+    """Returns the names of the parsers that can be loaded, fastest first.
+
+    :return: A list of names from ``BACKENDS``.
+    :rtype: ``list``
+    """
+    result = []
+    for name in BACKENDS:
+        try:
+            _load(name)
+        except ImportError:
+            continue
+        result.append(name)
+    return result
+
+def use(name=None):
+    """Makes the given parser the active one.
+
+    :param name: One of ``"lxml"``, ``"cElementTree"``, or ``"ElementTree"``.
+        If this value is ``None``, the fastest installed parser is used.
+    :type name: ``string``
+    :return: The name of the active parser.
+    :rtype: ``string``
+    :raises ImportError: The parser is not installed.
+    :raises ValueError: The name is not one of ``BACKENDS``.
+    """
+    global backend, ParseError, _impl
+    if name is None: name = available()[0]
+    impl = _load(name)
+    _impl, backend, ParseError = impl, name, impl.ParseError
+    return backend
+
+def XML(text):
+    """Parses a string that contains an XML document and returns its root
+    element.
+    """
+    return _impl.XML(text)
+
+def parse(source):
+    """Parses an XML document from a file name or file-like object and
+    returns its element tree.
+    """
+    return _impl.parse(source)
+
+def iterparse(source, events=("end",)):
+    """Parses an XML document from a file name or file-like object, and
+    returns an iterator of ``(event, element)`` pairs as the elements are
+    read.
+    """
+    return _impl.iterparse(source, events)
+
+def truncated(error):
+    """Returns whether the given parse error means that the document ended
+    before its root element was closed.
+    """
+    message = getattr(error, 'msg', None) or str(error)
+    return any(text in message for text in _TRUNCATED)
+
+use()
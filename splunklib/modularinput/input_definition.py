@@ -12,10 +12,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-try:
-    import xml.etree.cElementTree as ET
-except ImportError as ie:
-    import xml.etree.ElementTree as ET
+from splunklib import etree
 
 from utils import parse_xml_data
 
@@ -47,7 +44,7 @@ class InputDefinition:
         definition = InputDefinition()
 
         # parse XML from the stream, then get the root node
-        root = ET.parse(stream).getroot()
+        root = etree.parse(stream).getroot()
 
         for node in root:
             if node.tag == "configuration":
@@ -13,10 +13,7 @@
 # under the License.
 
 
-try:
-    import xml.etree.cElementTree as ET
-except ImportError as ie:
-    import xml.etree.ElementTree as ET
+from splunklib import etree
 
 from utils import parse_xml_data
 
@@ -68,7 +65,7 @@ class ValidationDefinition(object):
         definition = ValidationDefinition()
 
         # parse XML from the stream, then get the root node
-        root = ET.parse(stream).getroot()
+        root = etree.parse(stream).getroot()
 
         for node in root:
             # lone item node
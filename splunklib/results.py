@@ -32,11 +32,6 @@ as follows:::
     print "Results are a preview: %s" % reader.is_preview
 """
 
-try:
-    import xml.etree.cElementTree as et
-except:
-    import xml.etree.ElementTree as et
-
 try:
     from collections import OrderedDict
 except:
@@ -47,6 +42,8 @@ try:
 except:
     from StringIO import StringIO
 
+import etree
+
 __all__ = [
     "ResultsReader",
     "Message"
@@ -209,7 +206,7 @@ class ResultsReader(object):
         result = None
         values = None
         try:
-            for event, elem in et.iterparse(stream, events=('start', 'end')):
+            for event, elem in etree.iterparse(stream, events=('start', 'end')):
                 if elem.tag == 'results' and event == 'start':
                     # The wrapper element is a <results preview="0|1">. We
                     # don't care about it except to tell is whether these
@@ -257,10 +254,10 @@ class ResultsReader(object):
                         text = elem.text if elem.text is not None else ""
                         yield Message(msg_type, text.encode('utf8'))
                         elem.clear()
-        except SyntaxError as pe:
+        except etree.ParseError as pe:
             # This is here to handle the same incorrect return from
             # splunk that is described in __init__.
-            if 'no element found' in pe.msg:
+            if etree.truncated(pe):
                 return
             else:
                 raise
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# Copyright 2011-2014 Splunk, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"): you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Times each installed XML parser (see splunklib.etree) on the recorded
+responses in tests/data, and checks that every parser reads the same data.
+
+    python bench_xml.py [--repeat N] [atom-response.xml ...]
+
+Further Atom responses saved from splunkd may be given on the command line.
+"""
+
+from os import path
+from StringIO import StringIO
+import sys
+import time
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), ".."))
+
+import splunklib.data as data
+import splunklib.etree as etree
+import splunklib.results as results
+from splunklib.modularinput.input_definition import InputDefinition
+
+ENTRY = "{http://www.w3.org/2005/Atom}entry"
+
+def read(name):
+    testpath = path.dirname(path.abspath(__file__))
+    return open(path.join(testpath, name), 'r').read()
+
+def cases(atom):
+    yield "data.load", lambda: [data.load(text) for text in atom]
+    yield "data.iterload", \
+        lambda: [list(data.iterload(StringIO(text), ENTRY)) for text in atom]
+    text = read("data/streaming_results.xml")
+    yield "results.ResultsReader", \
+        lambda: list(results.ResultsReader(StringIO(text)))
+    definition = read("modularinput/data/conf_with_2_inputs.xml")
+    yield "InputDefinition.parse", \
+        lambda: InputDefinition.parse(StringIO(definition))
+
+def timeit(function, repeat):
+    best = None
+    for _ in range(3):
+        start = time.time()
+        for _ in range(repeat): function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv):
+    repeat = 200
+    if argv[:1] == ["--repeat"]:
+        repeat, argv = int(argv[1]), argv[2:]
+    atom = [read("data/services.xml"), read("data/services.server.info.xml")]
+    atom.extend(open(name, 'r').read() for name in argv)
+
+    active = etree.backend
+    names = etree.available()
+    timings = {}
+    try:
+        etree.use("ElementTree")
+        expected = dict((case, function()) for case, function in cases(atom))
+        for name in names:
+            etree.use(name)
+            for case, function in cases(atom):
+                if not function() == expected[case]:
+                    print "%s: %s reads different data" % (name, case)
+                    return 1
+                timings[name, case] = timeit(function, repeat)
+    finally:
+        etree.use(active)
+
+    print "%-24s" % "" + "".join("%18s" % name for name in names)
+    for case, _ in cases(atom):
+        base = timings["ElementTree", case]
+        print "%-24s" % case + "".join(
+            "%10.1fms %5.1fx" % (timings[name, case] * 1000, base / timings[name, case])
+            for name in names)
+    print "\nDefault parser: %s" % active
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
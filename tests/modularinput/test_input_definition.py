@@ -16,6 +16,7 @@
 
 from tests.modularinput.modularinput_testlib import unittest, data_open
 from splunklib.modularinput.input_definition import InputDefinition
+from splunklib import etree
 
 class InputDefinitionTestCase(unittest.TestCase):
 
@@ -69,5 +70,18 @@ class InputDefinitionTestCase(unittest.TestCase):
         with self.assertRaises(ValueError):
             found = InputDefinition.parse(data_open("data/conf_with_invalid_inputs.xml"))
 
+    def test_parse_inputdef_with_each_backend(self):
+        """Does every XML parser produce the same definition."""
+
+        expected = InputDefinition.parse(data_open("data/conf_with_2_inputs.xml"))
+        active = etree.backend
+        try:
+            for name in etree.available():
+                etree.use(name)
+                found = InputDefinition.parse(data_open("data/conf_with_2_inputs.xml"))
+                self.assertEqual(expected, found)
+        finally:
+            etree.use(active)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
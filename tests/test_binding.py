@@ -15,8 +15,17 @@
 # under the License.
 
 
+import errno
+import gzip
+import httplib
+import io
+import json
+import os
+import shutil
+import tempfile
 import uuid
 import urllib2
+import urlparse
 from StringIO import StringIO
 from xml.etree.ElementTree import XML
 
@@ -26,6 +35,9 @@ import unittest
 import socket
 import sys
 import ssl
+import threading
+import time
+import zlib
 
 import splunklib.binding as binding
 from splunklib.binding import HTTPError, AuthenticationError, UrlEncoded
@@ -131,8 +143,241 @@ class TestResponseReader(BindingTestCase):
         self.assertEqual(arr[:5], "ected")
         self.assertTrue(response.empty)
 
+    def test_read_less_than_peeked(self):
+        txt = "abcdefgh"
+        response = binding.ResponseReader(StringIO(txt))
+        self.assertEqual(response.peek(6), "abcdef")
+        self.assertEqual(response.read(2), "ab")
+        self.assertEqual(response.peek(2), "cd")
+        self.assertEqual(response.read(5), "cdefg")
+        self.assertEqual(response.read(), "h")
+
+    def test_readinto_after_peek(self):
+        txt = "Checking readinto works as expected"
+        response = binding.ResponseReader(io.BytesIO(txt))
+        self.assertEqual(response.peek(4), "Chec")
+        arr = bytearray(10)
+        self.assertEqual(response.readinto(arr), 10)
+        self.assertEqual(arr, "Checking r")
+        self.assertEqual(response.read(), txt[10:])
+
+    def test_buffered_reader(self):
+        txt = "line one\nline two\n" * 1000
+        response = binding.ResponseReader(StringIO(txt))
+        reader = io.BufferedReader(response)
+        self.assertEqual(reader.readline(), "line one\n")
+        self.assertEqual(reader.read(), txt[9:])
+        reader.close()
+        self.assertTrue(response.closed)
+
+    def test_gzip(self):
+        txt = "<results>%s</results>" % ("<result>abc</result>" * 10000)
+        compressed = StringIO()
+        f = gzip.GzipFile(fileobj=compressed, mode="wb")
+        f.write(txt)
+        f.close()
+        response = binding.ResponseReader(
+            StringIO(compressed.getvalue()), content_encoding="gzip")
+        self.assertEqual(response.peek(9), "<results>")
+        arr = bytearray(9)
+        self.assertEqual(response.readinto(arr), 9)
+        self.assertEqual(arr, "<results>")
+        self.assertEqual(response.read(8), "<result>")
+        self.assertEqual(response.read(), txt[17:])
+        self.assertTrue(response.empty)
+
+    def test_deflate(self):
+        txt = "Checking deflate works as expected"
+        response = binding.ResponseReader(
+            StringIO(zlib.compress(txt)), content_encoding="deflate")
+        self.assertEqual(response.read(8), "Checking")
+        self.assertEqual(response.read(), txt[8:])
+        self.assertTrue(response.empty)
+
 
 
+class TestHTTPError(unittest.TestCase):
+    def error(self, body, content_type="text/xml; charset=utf-8"):
+        return HTTPError(binding.record({
+            'status': 404, 'reason': "Not Found",
+            'headers': [("Content-Type", content_type)],
+            'body': StringIO(body)}))
+
+    def test_xml(self):
+        error = self.error("<response><messages><msg type='ERROR'>No such app</msg>"
+                           "</messages></response>")
+        self.assertEqual(str(error), "HTTP 404 Not Found -- No such app")
+
+    def test_json(self):
+        error = self.error('{"messages":[{"type":"ERROR","text":"No such app"}]}',
+                           "application/json; charset=UTF-8")
+        self.assertEqual(str(error), "HTTP 404 Not Found -- No such app")
+        self.assertEqual(str(self.error('{"messages":[]}', "application/json")),
+                         "HTTP 404 Not Found")
+
+    def test_unparseable(self):
+        self.assertEqual(str(self.error("Not found, sorry.\n")),
+                         "HTTP 404 Not Found -- Not found, sorry.")
+        self.assertEqual(str(self.error("<html>", "application/json")),
+                         "HTTP 404 Not Found -- <html>")
+        self.assertEqual(str(self.error("")), "HTTP 404 Not Found")
+
+class FakeConnection(object):
+    def __init__(self, *key):
+        self.key = key
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class TestConnectionPool(unittest.TestCase):
+    key = ("https", "localhost", 8089)
+
+    def test_reuses_checked_in_connection(self):
+        pool = binding._ConnectionPool(FakeConnection, 2, 60)
+        connection, reused = pool.checkout(self.key)
+        self.assertFalse(reused)
+        self.assertEqual(connection.key, self.key)
+        pool.checkin(self.key, connection)
+        self.assertEqual(pool.checkout(self.key), (connection, True))
+        other, reused = pool.checkout(("http", "localhost", 8089))
+        self.assertFalse(reused)
+
+    def test_max_size(self):
+        pool = binding._ConnectionPool(FakeConnection, 1, 60)
+        first, _ = pool.checkout(self.key)
+        second, _ = pool.checkout(self.key)
+        pool.checkin(self.key, first)
+        pool.checkin(self.key, second)
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+
+    def test_idle_timeout(self):
+        pool = binding._ConnectionPool(FakeConnection, 2, -1)
+        connection, _ = pool.checkout(self.key)
+        pool.checkin(self.key, connection)
+        other, reused = pool.checkout(self.key)
+        self.assertFalse(reused)
+        self.assertTrue(connection.closed)
+
+    def test_clear(self):
+        pool = binding._ConnectionPool(FakeConnection, 2, 60)
+        connection, _ = pool.checkout(self.key)
+        pool.checkin(self.key, connection)
+        pool.clear()
+        self.assertTrue(connection.closed)
+        self.assertFalse(pool.checkout(self.key)[1])
+
+class TestStreamingBody(unittest.TestCase):
+    # Accepts a single request on a local socket and keeps the raw bytes
+    # that arrive, up to the end of a chunked body.
+    def setUp(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.received = []
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        self.listener.close()
+        self.thread.join()
+
+    def serve(self):
+        connection, _ = self.listener.accept()
+        data = ""
+        while not data.endswith("0\r\n\r\n"):
+            block = connection.recv(4096)
+            if not block:
+                break
+            data += block
+        self.received.append(data)
+        connection.sendall("HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+        connection.close()
+
+    def test_chunked_framing(self):
+        url = "http://127.0.0.1:%d/services/receivers/stream" % \
+            self.listener.getsockname()[1]
+        body = iter(["abc", "", "0123456789abcdef"])
+        response = binding.handler()(url, {
+            "method": "POST", "headers": [], "body": body})
+        self.assertEqual(response["status"], 200)
+        self.thread.join()
+        head, wire = self.received[0].split("\r\n\r\n", 1)
+        headers = [line.lower() for line in head.split("\r\n")[1:]]
+        self.assertTrue("transfer-encoding: chunked" in headers)
+        self.assertFalse([h for h in headers if h.startswith("content-length")])
+        self.assertEqual(wire, "3\r\nabc\r\n10\r\n0123456789abcdef\r\n0\r\n\r\n")
+
+class TestStaleConnection(unittest.TestCase):
+    # Answers one request on each connection it accepts and then closes the
+    # connection, like splunkd dropping an idle keep-alive connection. The
+    # response is kept alive unless the request asks to close it.
+    def setUp(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(5)
+        self.listener.settimeout(0.1)
+        self.url = "http://127.0.0.1:%d/services" % self.listener.getsockname()[1]
+        self.requests = []
+        self.closed = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        self.stopped = True
+        self.thread.join()
+        self.listener.close()
+
+    def serve(self):
+        while not self.stopped:
+            try:
+                connection, _ = self.listener.accept()
+            except socket.timeout:
+                continue
+            connection.settimeout(None)
+            data = ""
+            while "\r\n\r\n" not in data:
+                block = connection.recv(4096)
+                if not block:
+                    break
+                data += block
+            self.requests.append(data.split(" ", 1)[0])
+            close = "\r\nconnection: close\r\n" in data.lower()
+            connection.sendall("HTTP/1.1 200 OK\r\n%sContent-Length: 2\r\n\r\nok" %
+                               ("Connection: close\r\n" if close else ""))
+            connection.close()
+            self.closed.set()
+
+    def send(self, handler, method):
+        self.closed.clear()
+        response = handler(self.url, {"method": method, "headers": [], "body": ""})
+        self.assertEqual(response["body"].read(), "ok")
+        self.closed.wait(5)
+
+    def test_unpooled_response_body(self):
+        # The unpooled handler closes its connection as soon as the response
+        # arrives, which must not cut off the body.
+        handler = binding.handler()
+        self.send(handler, "GET")
+        self.send(handler, "POST")
+        self.assertEqual(self.requests, ["GET", "POST"])
+
+    def test_idempotent_request_is_retried(self):
+        handler = binding.handler(pool_size=1)
+        self.send(handler, "GET")
+        self.send(handler, "GET")
+        self.assertEqual(self.requests, ["GET", "GET"])
+
+    def test_post_is_not_retried(self):
+        handler = binding.handler(pool_size=1)
+        self.send(handler, "GET")
+        self.assertRaises((httplib.BadStatusLine, socket.error),
+                          handler, self.url,
+                          {"method": "POST", "headers": [], "body": "x=1"})
+        self.assertEqual(self.requests, ["GET"])
+
 class TestUrlEncoded(BindingTestCase):
     def test_idempotent(self):
         a = UrlEncoded('abc')
@@ -263,6 +508,22 @@ class TestUserManipulation(BindingTestCase):
         )
         self.assertEqual(response.status, 200)
 
+    def test_post_with_streamed_body_to_receivers_simple(self):
+        lines = ("Hello, world %d!\n" % i for i in range(10))
+        response = self.context.post(
+            '/services/receivers/simple',
+            source='sdk', sourcetype='sdk_test',
+            body=lines
+        )
+        self.assertEqual(response.status, 200)
+
+        response = self.context.post(
+            '/services/receivers/simple',
+            source='sdk', sourcetype='sdk_test',
+            body=StringIO('Hello, world!')
+        )
+        self.assertEqual(response.status, 200)
+
 
 class TestSocket(BindingTestCase):
     def test_socket(self):
@@ -461,6 +722,8 @@ class TestPluggableHTTP(testlib.SDKTestCase):
         paths = ["/services", "authentication/users",
                  "search/jobs"]
         handlers = [binding.handler(),  # default handler
+                    binding.handler(pool_size=2),  # keep-alive handler
+                    binding.handler(compress=True),  # gzip handler
                     urllib2_handler]
         for handler in handlers:
             logging.debug("Connecting with handler %s", handler)
@@ -486,6 +749,804 @@ class TestLogout(BindingTestCase):
         response = self.context.get("/services")
         self.assertEqual(response.status, 200)
 
+class FakeSplunkd(object):
+    """A request handler that fakes one or more splunkd instances.
+
+    Each host has a single valid session, which the next login to the host
+    replaces; logins with a password other than *password* fail. Every
+    request is recorded in ``requests`` as ``(host, method, path)``, and
+    requests to the hosts in ``down`` are refused. A job created by a POST to
+    search/jobs only exists on the host that created it. Other requests get
+    an empty response.
+    """
+    def __init__(self, password="changeme", delay=0):
+        self.password = password
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.down = set()
+        self.requests = []
+        self.sessions = {}
+        self.jobs = {}
+        self.logins = 0
+
+    def response(self, status, reason, body):
+        return {'status': status, 'reason': reason, 'headers': [],
+                'body': StringIO(body)}
+
+    def __call__(self, url, message, **kwargs):
+        time.sleep(self.delay) # Let the requests of several threads overlap.
+        scheme, host, port, path = binding._spliturl(url)
+        if host in self.down:
+            raise socket.error(errno.ECONNREFUSED, "Connection refused")
+        method = message['method']
+        with self.lock:
+            self.requests.append((host, method, path))
+            if path == "/services/auth/login":
+                form = urlparse.parse_qs(message['body'])
+                if form.get("password") != [self.password]:
+                    return self.response(401, "Unauthorized",
+                        "<response><messages><msg>Login failed</msg></messages></response>")
+                self.logins += 1
+                self.sessions[host] = "session%d" % self.logins
+                return self.response(200, "OK",
+                    "<response><sessionKey>%s</sessionKey></response>" % self.sessions[host])
+            headers = dict(message['headers'])
+            if path != "/services/server/info" and \
+                    headers.get("Authorization") != "Splunk %s" % self.sessions.get(host):
+                return self.response(401, "Unauthorized",
+                    "<response><messages><msg>Unauthorized</msg></messages></response>")
+            if path == "/services/search/jobs" and method == "POST":
+                sid = "%s.%d" % (host, len(self.requests))
+                self.jobs[sid] = host
+                return self.response(201, "Created",
+                    "<response>\n<sid>%s</sid>\n</response>" % sid)
+            if path.startswith("/services/search/jobs/"):
+                sid = path.split("/")[4]
+                if self.jobs.get(sid) != host:
+                    return self.response(404, "Not Found",
+                        "<response><messages><msg>Unknown sid.</msg></messages></response>")
+                if method == "DELETE":
+                    del self.jobs[sid]
+            return self.response(200, "OK", "<response/>")
+
+class TestConcurrentAutologin(unittest.TestCase):
+    def setUp(self):
+        self.splunkd = FakeSplunkd(delay=0.01)
+
+    def test_single_relogin_across_threads(self):
+        context = binding.connect(handler=self.splunkd, autologin=True,
+                                  username="admin", password="changeme")
+        self.assertEqual(self.splunkd.logins, 1)
+        self.splunkd.sessions["localhost"] = "expired"
+        errors = []
+        def worker():
+            try:
+                context.get("/services")
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.splunkd.logins, 2)
+        self.assertEqual(context.token, "Splunk session2")
+
+class TestMultipleHosts(unittest.TestCase):
+    def setUp(self):
+        self.splunkd = FakeSplunkd()
+
+    def connect(self, **kwargs):
+        return binding.connect(handler=self.splunkd, username="admin",
+                               password="changeme", scheme="http",
+                               hosts=["sh1", "sh2:8090", ("sh3", "8091")],
+                               **kwargs)
+
+    def hosts(self, method="GET", path="/services/apps/local"):
+        return [h for h, m, p in self.splunkd.requests if m == method and p == path]
+
+    def test_endpoint(self):
+        self.assertEqual(binding._endpoint("sh1"), ("sh1", 8089))
+        self.assertEqual(binding._endpoint("sh1:8090"), ("sh1", 8090))
+        self.assertEqual(binding._endpoint(("sh1", "8090")), ("sh1", 8090))
+        self.assertEqual(binding._endpoint("::1"), ("::1", 8089))
+        self.assertEqual(binding._endpoint("[::1]:8090"), ("::1", 8090))
+
+    def test_single_host(self):
+        context = binding.Context(host="sh1", port=8090)
+        self.assertEqual(context.authority, "https://sh1:8090")
+        context.host = "sh2"
+        self.assertEqual(context.authority, "https://sh2:8090")
+
+    def test_reads_are_balanced(self):
+        context = self.connect()
+        self.assertEqual(self.hosts("POST", "/services/auth/login"), ["sh1"])
+        for _ in range(6):
+            context.get("/services/apps/local")
+        self.assertEqual(self.hosts(), ["sh1", "sh2", "sh3"] * 2)
+        # Every host was logged in once, and has its own session.
+        self.assertEqual(self.hosts("POST", "/services/auth/login"),
+                         ["sh1", "sh2", "sh3"])
+        self.assertEqual(context.token, "Splunk %s" % self.splunkd.sessions["sh1"])
+        self.assertEqual(len(set(self.splunkd.sessions.values())), 3)
+
+    def test_login_is_not_preceded_by_login(self):
+        context = self.connect()
+        context._members[0].token = binding._NoAuthenticationToken
+        context.login()
+        self.assertEqual(self.hosts("POST", "/services/auth/login"), ["sh1", "sh1"])
+
+    def test_writes_go_to_first_host(self):
+        context = self.connect()
+        for _ in range(3):
+            context.post("/services/apps/local", name="a")
+            context.request("/services/apps/local", method="DELETE")
+        self.assertEqual(self.hosts("POST"), ["sh1"] * 3)
+        self.assertEqual(self.hosts("DELETE"), ["sh1"] * 3)
+
+    def test_jobs_are_polled_where_they_were_created(self):
+        context = self.connect()
+        for _ in range(3):
+            context.get("/services/apps/local")
+        self.splunkd.down.add("sh1")
+        response = context.post("search/jobs", search="search *")
+        sid = XML(response.body.read()).findtext("sid")
+        self.splunkd.down.clear()
+        context.check_health()
+        self.assertEqual(self.splunkd.jobs[sid], "sh2")
+        for _ in range(4):
+            context.get("search/jobs/%s" % sid)
+            context.get("/servicesNS/admin/search/search/jobs/%s/results" % sid,
+                        output_mode="json")
+        context.post("search/jobs/%s/control" % sid, action="pause")
+        self.assertEqual(set(h for h, m, p in self.splunkd.requests if sid in p), set(["sh2"]))
+        # Reads of other paths are still balanced.
+        for _ in range(3):
+            context.get("/services/apps/local")
+        self.assertEqual(sorted(self.hosts()[-3:]), ["sh1", "sh2", "sh3"])
+        context.delete("search/jobs/%s" % sid)
+        self.assertEqual(self.splunkd.jobs, {})
+        self.assertEqual(context._balancer._pinned, {})
+
+    def test_created_entities_are_pinned(self):
+        members = [binding._Member("https", h, 8089, None) for h in "abc"]
+        balancer = binding._Balancer(members)
+        body = '<feed><title>apps</title><entry><title>my &amp; app</title></entry></feed>'
+        response = binding.record({'status': 201, 'body': StringIO(body)})
+        self.assertEqual(binding._created("apps/local", response),
+                         ["apps/local/my & app"])
+        self.assertEqual(response.body.read(), body)
+        response = binding.record({'status': 201, 'body': StringIO(
+            '{"links": {}, "entry": [{"name": "dispatched", "id": "x"}]}')})
+        self.assertEqual(binding._created("saved/searches", response),
+                         ["saved/searches/dispatched"])
+        response = binding.record({'status': 200, 'body': StringIO('{"sid": "1.2"}')})
+        self.assertEqual(binding._created("saved/searches/s/dispatch", response),
+                         ["search/jobs/1.2"])
+        balancer.pin("apps/local/my & app", members[2])
+        for _ in range(3):
+            member = balancer.choose(True, (), "apps/local/my & app/acl")
+            self.assertEqual(member, members[2])
+        self.assertEqual(balancer.choose(False, (), "apps/local/my & app"), members[2])
+        self.assertEqual(balancer.choose(False, (), "apps/local"), members[0])
+        members[2].down_until = time.time() + 60
+        self.assertNotEqual(balancer.choose(True, (), "apps/local/my & app"), members[2])
+
+    def test_failover(self):
+        context = self.connect(health_check_interval=60)
+        self.splunkd.down.add("sh1")
+        for _ in range(4):
+            context.get("/services/apps/local")
+        context.post("/services/apps/local", name="a")
+        self.assertEqual(sorted(self.hosts()), ["sh2", "sh2", "sh3", "sh3"])
+        self.assertEqual(self.hosts("POST"), ["sh2"])
+        self.assertEqual(context.check_health(), [("sh2", 8090), ("sh3", 8091)])
+        self.splunkd.down.clear()
+        self.assertEqual(len(context.check_health()), 3)
+        context.post("/services/apps/local", name="a")
+        self.assertEqual(self.hosts("POST"), ["sh2", "sh1"])
+
+    def test_all_hosts_down(self):
+        context = self.connect()
+        self.splunkd.down.update(["sh1", "sh2", "sh3"])
+        self.assertRaises(socket.error, context.get, "/services/apps/local")
+        self.splunkd.down.clear()
+        context.get("/services/apps/local")
+
+    def test_least_outstanding(self):
+        members = [binding._Member("https", h, 8089, None) for h in "abc"]
+        balancer = binding._Balancer(members, "least_outstanding")
+        first = balancer.choose(True)
+        second = balancer.choose(True)
+        self.assertNotEqual(first, second)
+        balancer.release(first, False)
+        self.assertEqual(balancer.choose(True), first)
+        self.assertRaises(ValueError, binding._Balancer, members, "random")
+
+class TestCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def handler(self, url, message, **kwargs):
+        with self.lock:
+            self.calls.append(url)
+        time.sleep(0.05) # Let the requests of all threads overlap.
+        status = 404 if "missing" in url else 200
+        body = "<response><messages><msg>%s</msg></messages></response>" % url
+        return {'status': status, 'reason': "", 'headers': [],
+                'body': StringIO(body)}
+
+    def get_concurrently(self, context, paths):
+        results = [None] * len(paths)
+        def worker(i):
+            try:
+                results[i] = context.get(paths[i]).body.read()
+            except HTTPError as he:
+                results[i] = he
+        threads = [threading.Thread(target=worker, args=(i,))
+                   for i in range(len(paths))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_identical_gets_share_a_request(self):
+        context = binding.Context(handler=self.handler, coalesce=True)
+        results = self.get_concurrently(context, ["/services/apps/local"] * 8)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(results, [results[0]] * 8)
+        self.assertTrue("/services/apps/local" in results[0])
+        # A request after the shared one has finished is sent again.
+        context.get("/services/apps/local")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_different_gets_do_not(self):
+        context = binding.Context(handler=self.handler, coalesce=True)
+        self.get_concurrently(context, ["/services/apps/local", "/services/server/info"] * 4)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_errors_are_shared(self):
+        context = binding.Context(handler=self.handler, coalesce=True)
+        results = self.get_concurrently(context, ["/services/missing"] * 4)
+        self.assertEqual(len(self.calls), 1)
+        for result in results:
+            self.assertTrue(isinstance(result, HTTPError))
+            self.assertEqual(result.status, 404)
+
+    def test_off_by_default(self):
+        context = binding.Context(handler=self.handler)
+        self.get_concurrently(context, ["/services/apps/local"] * 4)
+        self.assertEqual(len(self.calls), 4)
+
+class TestResponseCache(unittest.TestCase):
+    # A handler that fakes splunkd, and counts the GET requests to each path.
+    # Paths under /services/tagged/ have an ETag, and the response to a
+    # request that matches it is 304.
+    def setUp(self):
+        self.gets = []
+        self.version = "1"
+
+    def handler(self, url, message, **kwargs):
+        path = binding._spliturl(url)[3].split('?')[0]
+        headers = dict(message['headers'])
+        if message['method'] == "GET":
+            self.gets.append((path, headers.get("If-None-Match")))
+        response_headers = []
+        if path.startswith("/services/tagged/"):
+            if headers.get("If-None-Match") == self.version:
+                return {'status': 304, 'reason': "Not Modified",
+                        'headers': [], 'body': StringIO("")}
+            response_headers = [("etag", self.version)]
+        status = 404 if "missing" in path else 200
+        body = "<response><messages><msg>%s %s</msg></messages></response>" % (
+            path, self.version)
+        return {'status': status, 'reason': "", 'headers': response_headers,
+                'body': StringIO(body)}
+
+    def context(self, **kwargs):
+        return binding.Context(handler=self.handler,
+                               cache=binding.ResponseCache(**kwargs))
+
+    def test_fresh_responses_are_cached(self):
+        context = self.context()
+        for _ in range(3):
+            body = context.get("apps/local", count=0).body.read()
+            self.assertTrue("/services/apps/local 1" in body)
+        context.get("apps/local", count=1)
+        context.get("apps/local", owner="admin", app="search")
+        self.assertEqual(len(self.gets), 3)
+
+    def test_sessions_do_not_share_responses(self):
+        cache = binding.ResponseCache()
+        alice = binding.Context(handler=self.handler, cache=cache, token="alice")
+        bob = binding.Context(handler=self.handler, cache=cache, token="bob")
+        for context in [alice, bob, alice, bob]:
+            context.get("apps/local")
+        self.assertEqual(len(self.gets), 2)
+
+    def test_expiry(self):
+        context = self.context(ttl=0.05, ttls={"server/info": 0})
+        context.get("apps/local")
+        context.get("server/info")
+        context.get("server/info")
+        context.get("search/jobs")
+        context.get("search/jobs")
+        self.assertEqual(len(self.gets), 5)
+        time.sleep(0.1)
+        context.get("apps/local")
+        self.assertEqual(len(self.gets), 6)
+
+    def test_errors_are_not_cached(self):
+        context = self.context()
+        self.assertRaises(HTTPError, context.get, "missing")
+        self.assertRaises(HTTPError, context.get, "missing")
+        self.assertEqual(len(self.gets), 2)
+
+    def test_revalidation(self):
+        context = self.context(ttl=0)
+        context._cache.ttls["tagged"] = 0.01
+        context.get("tagged/a")
+        time.sleep(0.05)
+        body = context.get("tagged/a").body.read()
+        self.assertTrue("/services/tagged/a 1" in body)
+        self.version = "2"
+        time.sleep(0.05)
+        body = context.get("tagged/a").body.read()
+        self.assertTrue("/services/tagged/a 2" in body)
+        self.assertEqual(self.gets, [("/services/tagged/a", None),
+                                     ("/services/tagged/a", "1"),
+                                     ("/services/tagged/a", "1")])
+
+    def test_writes_invalidate(self):
+        context = self.context()
+        context.get("apps/local")
+        context.get("apps/local/search")
+        context.get("apps/local/search/setup")
+        context.get("server/info")
+        context.post("apps/local/search", visible=False)
+        for path in ["apps/local", "apps/local/search",
+                     "apps/local/search/setup", "server/info"]:
+            context.get(path)
+        self.assertEqual(len(self.gets), 7)
+        context.delete("apps/local/search")
+        context.request("apps/local", method="GET")
+        context.get("apps/local")
+        self.assertEqual(len(self.gets), 9)
+
+    def test_lru_eviction(self):
+        # Each body is 65 bytes, so three fit.
+        context = self.context(max_bytes=200)
+        for path in ["a", "b", "c", "a", "d", "a", "b"]:
+            context.get(path)
+        self.assertEqual([p for p, _ in self.gets],
+                         ["/services/%s" % p for p in ["a", "b", "c", "d", "b"]])
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "tokens")
+        self.splunkd = FakeSplunkd()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def connect(self, username="admin"):
+        return binding.connect(handler=self.splunkd, username=username,
+                               password="changeme",
+                               token_cache=binding.TokenCache(self.path))
+
+    def test_login_is_shared(self):
+        self.connect().get("/services")
+        self.assertEqual(os.stat(self.path).st_mode & 0777, 0600)
+        context = self.connect()
+        self.assertEqual(context.token, "Splunk session1")
+        context.get("/services")
+        self.assertEqual(self.splunkd.logins, 1)
+        self.connect("other")
+        self.assertEqual(self.splunkd.logins, 2)
+
+    def test_file_mode(self):
+        cache = binding.TokenCache(self.path)
+        self.assertEqual(cache.get("localhost", 8089, "admin", "changeme"), None)
+        self.assertFalse(os.path.exists(self.path))
+        with open(self.path, "w") as f:
+            f.write("{}")
+        os.chmod(self.path, 0644)
+        cache.set("localhost", 8089, "admin", "changeme", "Splunk session1")
+        self.assertEqual(os.stat(self.path).st_mode & 0777, 0600)
+
+    def test_expired_token(self):
+        self.connect()
+        self.splunkd.sessions["localhost"] = "expired"
+        context = self.connect()
+        self.assertEqual(self.splunkd.logins, 1)
+        context.get("/services")
+        self.assertEqual(self.splunkd.logins, 2)
+        self.connect().get("/services")
+        self.assertEqual(self.splunkd.logins, 2)
+
+    def test_unreadable_file(self):
+        with open(self.path, "w") as f:
+            f.write("not json")
+        self.connect().get("/services")
+        self.assertEqual(self.splunkd.logins, 1)
+        cache = binding.TokenCache(os.path.join(self.directory, "missing", "tokens"))
+        self.assertEqual(cache.get("localhost", 8089, "admin", "changeme"), None)
+        cache.set("localhost", 8089, "admin", "changeme", "Splunk session1")
+
+    def test_password_is_checked(self):
+        self.connect().get("/services")
+        context = binding.Context(handler=self.splunkd, username="admin",
+                                  password="wrong",
+                                  token_cache=binding.TokenCache(self.path))
+        self.assertRaises(AuthenticationError, context.login)
+        self.assertEqual(context.token, binding._NoAuthenticationToken)
+        with open(self.path) as f:
+            self.assertFalse("changeme" in f.read())
+        # A new password replaces the token saved with the old one.
+        self.splunkd.password = "wrong"
+        context.login()
+        with open(self.path) as f:
+            self.assertEqual(json.load(f).values(), ["Splunk session2"])
+
+    def test_cached_login_covers_every_host(self):
+        def connect():
+            return binding.connect(handler=self.splunkd, username="admin",
+                                   password="changeme", hosts=["sh1", "sh2"],
+                                   token_cache=binding.TokenCache(self.path))
+        connect()
+        context = connect()
+        self.assertEqual(self.splunkd.logins, 1)
+        context.get("/services")
+        context.get("/services")
+        self.assertEqual(self.splunkd.logins, 2)
+        self.assertEqual([h for h, m, p in self.splunkd.requests if p == "/services"],
+                         ["sh1", "sh2"])
+
+class TestSSLContext(unittest.TestCase):
+    def test_unverified_by_default(self):
+        context = binding._ssl_context(None, None, None, None)
+        self.assertEqual(context.verify_mode, ssl.CERT_NONE)
+        self.assertFalse(context.check_hostname)
+
+    def test_verified(self):
+        context = binding._ssl_context(None, None, True, None)
+        self.assertEqual(context.verify_mode, ssl.CERT_REQUIRED)
+        self.assertTrue(context.check_hostname)
+
+    def test_shared(self):
+        context = binding._ssl_context(None, None, False, None)
+        self.assertTrue(binding._ssl_context(None, None, False, None) is context)
+        self.assertFalse(binding._ssl_context(None, None, True, None) is context)
+        # No CA certificates are loaded when nothing is verified.
+        self.assertEqual(context.cert_store_stats()["x509_ca"], 0)
+        self.assertEqual(context.verify_mode, ssl.CERT_NONE)
+        disabled = ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3
+        self.assertEqual(context.options & disabled, disabled)
+
+    def test_built_on_first_connection(self):
+        binding._ssl_contexts.clear()
+        binding.handler(verify=True)
+        self.assertEqual(binding._ssl_contexts, {})
+
+    def test_missing_ca_file(self):
+        self.assertRaises(IOError, binding._ssl_context,
+                          None, None, True, "/nonexistent/ca.pem")
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.order = []
+
+    def handler(self, url, message, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.order.append(url)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        return {'status': 200, 'reason': "OK", 'headers': [],
+                'body': StringIO("<response/>")}
+
+    def run_threads(self, targets):
+        threads = [threading.Thread(target=target) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_max_in_flight(self):
+        limiter = binding.RateLimiter(max_in_flight=3)
+        context = binding.Context(handler=self.handler, limit=limiter)
+        self.run_threads([lambda: context.get("/services")] * 10)
+        self.assertEqual(self.max_in_flight, 3)
+        self.assertEqual(limiter.in_flight(), 0)
+        self.assertEqual(limiter.waiting(), 0)
+
+    def test_limit_is_per_host(self):
+        limiter = binding.RateLimiter(max_in_flight=1)
+        http = binding.HttpLib(self.handler, limit=limiter)
+        self.run_threads([lambda: http.get("https://a:8089/services"),
+                          lambda: http.get("https://b:8089/services")])
+        self.assertEqual(self.max_in_flight, 2)
+
+    def test_fifo(self):
+        limiter = binding.RateLimiter(max_in_flight=1)
+        http = binding.HttpLib(self.handler, limit=limiter)
+        key = ("https", "localhost", "8089")
+        limiter._acquire(key)
+        threads = []
+        for i in range(5):
+            thread = threading.Thread(
+                target=http.get, args=("https://localhost:8089/%d" % i,))
+            thread.start()
+            threads.append(thread)
+            while limiter.waiting("localhost", 8089) < i + 1:
+                time.sleep(0.001)
+        self.assertEqual(limiter.in_flight("localhost"), 1)
+        limiter._release(key)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.order, ["https://localhost:8089/%d" % i
+                                      for i in range(5)])
+
+    def test_rate(self):
+        limiter = binding.RateLimiter(rate=50, burst=2)
+        http = binding.HttpLib(lambda url, message: {
+            'status': 200, 'reason': "OK", 'headers': [],
+            'body': StringIO("")}, limit=limiter)
+        start = time.time()
+        for _ in range(7):
+            http.get("https://localhost:8089/services")
+        # Two requests go at once, and the other five at 50 per second.
+        self.assertTrue(time.time() - start >= 0.09)
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def handler(self, url, message, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Later requests finish first.
+        time.sleep(0.05 - 0.002 * int(url.rsplit("/", 1)[-1].split("?")[0]))
+        with self.lock:
+            self.in_flight -= 1
+        status = 404 if url.endswith("/13") else 200
+        body = "<response><messages><msg>%s %s</msg></messages></response>" % (
+            message['method'], url)
+        return {'status': status, 'reason': "", 'headers': [],
+                'body': StringIO(body)}
+
+    def test_ordered(self):
+        context = binding.Context(handler=self.handler)
+        requests = [("GET", "saved/searches/%d" % i, {'app': "search"})
+                    for i in range(20)]
+        results = list(context.batch(requests, max_workers=5))
+        self.assertEqual(self.max_in_flight, 5)
+        self.assertEqual([r.index for r in results], range(20))
+        for i, result in enumerate(results):
+            self.assertEqual(result.request, requests[i])
+            if i == 13:
+                self.assertEqual(result.response, None)
+                self.assertEqual(result.error.status, 404)
+                self.assertTrue(result.exc_info[1] is result.error)
+                self.assertTrue(result.exc_info[2] is not None)
+            else:
+                self.assertEqual(result.error, None)
+                self.assertEqual(result.exc_info, None)
+                self.assertTrue("GET https://localhost:8089/servicesNS/nobody/search/saved/searches/%d<" % i
+                                in result.response.body.read())
+
+    def test_unordered(self):
+        context = binding.Context(handler=self.handler)
+        requests = [("POST", "%d" % i, {'name': "x"}) for i in range(4)] + \
+                   [("DELETE", "4"), ("get", "5"), ("PUT", "6", {'body': "x"})]
+        results = list(context.batch(requests, ordered=False))
+        self.assertEqual(sorted(r.index for r in results), range(7))
+        self.assertNotEqual([r.index for r in results], range(7))
+        methods = [XML(r.response.body.read()).findtext("./messages/msg").split()[0]
+                   for r in sorted(results, key=lambda r: r.index)]
+        self.assertEqual(methods, ["POST"] * 4 + ["DELETE", "GET", "PUT"])
+
+    def test_empty(self):
+        context = binding.Context(handler=self.handler)
+        self.assertEqual(list(context.batch([])), [])
+
+    def test_pooled_raises(self):
+        def square(index, item):
+            if item == 3: raise ValueError(item)
+            return item * item
+        values = binding._pooled(square, range(6), 2)
+        self.assertEqual([values.next() for _ in range(3)], [0, 1, 4])
+        self.assertRaises(ValueError, values.next)
+        self.assertRaises(StopIteration, values.next)
+
+    def test_pooled_threads(self):
+        started = []
+        def record(index, item):
+            started.append(item)
+            return item
+        # Workers of earlier tests may still be exiting, so only new
+        # threads are counted.
+        threads = set(threading.enumerate())
+        def new_threads():
+            return [t for t in threading.enumerate() if t not in threads]
+        values = binding._pooled(record, range(100), 4, lookahead=2)
+        time.sleep(0.05)
+        # Nothing starts before the caller asks for a value.
+        self.assertEqual(started, [])
+        self.assertEqual(new_threads(), [])
+        self.assertEqual(values.next(), 0)
+        values.close()
+        values = binding._pooled(record, range(100), 4, lookahead=2)
+        self.assertEqual(values.next(), 0)
+        del values
+        time.sleep(0.05)
+        # The workers exited instead of waiting for slots forever.
+        self.assertEqual(new_threads(), [])
+        self.assertTrue(len(started) <= 6)
+
+    def test_lookahead(self):
+        context = binding.Context(handler=self.handler)
+        requests = [("GET", "%d" % i) for i in range(20)]
+        results = context.batch(requests, max_workers=8, lookahead=3)
+        first = results.next()
+        time.sleep(0.2)
+        # Only the requests the caller can take next have been made.
+        self.assertEqual(self.max_in_flight, 3)
+        self.assertEqual(first.index, 0)
+        self.assertEqual([r.index for r in results], range(1, 20))
+        self.assertEqual(self.max_in_flight, 3)
+
+class TestRetryPolicy(unittest.TestCase):
+    # A handler that replays canned (status, headers) responses.
+    def handler(self, responses):
+        self.requests = []
+        def request(url, message, **kwargs):
+            self.requests.append(message['method'])
+            status, headers = responses.pop(0)
+            body = "<response><messages><msg>%d</msg></messages></response>" % status
+            return {'status': status, 'reason': "", 'headers': headers,
+                    'body': StringIO(body)}
+        return request
+
+    def test_retries_idempotent_requests(self):
+        retry = binding.RetryPolicy(backoff=0)
+        http = binding.HttpLib(self.handler([(503, []), (502, []), (200, [])]), retry)
+        response = http.get("https://localhost:8089/services")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(self.requests, ["GET"] * 3)
+
+    def test_gives_up_after_retries(self):
+        retry = binding.RetryPolicy(retries=1, backoff=0)
+        http = binding.HttpLib(self.handler([(503, []), (503, [])]), retry)
+        self.assertRaises(HTTPError, http.get, "https://localhost:8089/services")
+        self.assertEqual(len(self.requests), 2)
+
+    def test_does_not_retry_post_or_client_errors(self):
+        retry = binding.RetryPolicy(backoff=0)
+        http = binding.HttpLib(self.handler([(503, [])]), retry)
+        self.assertRaises(HTTPError, http.post, "https://localhost:8089/services")
+        http = binding.HttpLib(self.handler([(404, [])]), retry)
+        self.assertRaises(HTTPError, http.get, "https://localhost:8089/services")
+        self.assertEqual(len(self.requests), 1)
+
+    def test_retry_after(self):
+        retry = binding.RetryPolicy(max_backoff=1)
+        http = binding.HttpLib(self.handler([(503, [("retry-after", "0")]),
+                                             (503, [("retry-after", "120")])]),
+                               retry)
+        self.assertRaises(HTTPError, http.get, "https://localhost:8089/services")
+        self.assertEqual(len(self.requests), 2)
+
+    def test_backoff(self):
+        retry = binding.RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+        self.assertEqual([retry.delay(i) for i in range(5)], [1, 2, 4, 5, 5])
+        retry = binding.RetryPolicy(backoff=1, max_backoff=5)
+        self.assertTrue(0 <= retry.delay(2) <= 4)
+
+    def test_circuit_breaker(self):
+        retry = binding.RetryPolicy(retries=0, failure_threshold=2, reset_timeout=60)
+        http = binding.HttpLib(self.handler([(503, []), (503, []), (200, [])]), retry)
+        url = "https://localhost:8089/services"
+        self.assertRaises(HTTPError, http.get, url)
+        self.assertRaises(HTTPError, http.get, url)
+        self.assertRaises(binding.CircuitOpenError, http.get, url)
+        self.assertEqual(len(self.requests), 2)
+        # Other hosts are not affected.
+        self.assertEqual(http.get("https://otherhost:8089/services").status, 200)
+
+class TestInstrumentation(unittest.TestCase):
+    def handler(self, url, message, **kwargs):
+        status = 404 if url.endswith("missing") else 200
+        body = "<response><messages><msg>%d</msg></messages></response>" % status
+        return {'status': status, 'reason': "", 'headers': [],
+                'body': binding.ResponseReader(StringIO(body)),
+                'timings': {'first_byte': 0.5, 'bytes_sent': 7}}
+
+    def test_record_after_body_is_read(self):
+        records = []
+        http = binding.HttpLib(self.handler, instrument=records.append)
+        response = http.get("https://localhost:8089/services/server/info?a=b")
+        self.assertEqual(records, [])
+        response.body.read()
+        self.assertEqual(len(records), 1)
+        stats = records[0]
+        self.assertEqual(stats.method, "GET")
+        self.assertEqual(stats.path, "/services/server/info")
+        self.assertEqual(stats.status, 200)
+        self.assertEqual(stats.error, None)
+        self.assertEqual(stats.retries, 0)
+        self.assertEqual(stats.first_byte, 0.5)
+        self.assertEqual(stats.bytes_sent, 7)
+        self.assertEqual(stats.bytes_received, 56)
+        self.assertEqual(stats.dns, None)
+        self.assertTrue(stats.total >= stats.read >= 0)
+
+    def test_record_of_failed_request(self):
+        records = []
+        http = binding.HttpLib(self.handler, instrument=records.append)
+        self.assertRaises(HTTPError, http.get, "https://localhost:8089/services/missing")
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].status, 404)
+        self.assertTrue(isinstance(records[0].error, HTTPError))
+
+    def test_request_stats(self):
+        stats = binding.RequestStats()
+        http = binding.HttpLib(self.handler, instrument=stats)
+        for path in ["/services/apps/local", "/servicesNS/admin/search/apps/local",
+                     "/services/server/info"]:
+            http.get("https://localhost:8089" + path).body.read()
+        self.assertRaises(HTTPError, http.get, "https://localhost:8089/services/missing")
+        summary = dict(((e.method, e.path), e) for e in stats.summary())
+        self.assertEqual(sorted(summary.keys()),
+                         [("GET", "apps/local"), ("GET", "missing"), ("GET", "server/info")])
+        apps = summary[("GET", "apps/local")]
+        self.assertEqual(apps.count, 2)
+        self.assertEqual(apps.errors, 0)
+        self.assertEqual(apps.bytes_received, 112)
+        self.assertTrue(apps.p50 <= apps.p95 <= apps.p99)
+        self.assertEqual(summary[("GET", "missing")].errors, 1)
+        stats.reset()
+        self.assertEqual(stats.summary(), [])
+
+    def test_request_stats_by_template(self):
+        stats = binding.RequestStats()
+        http = binding.HttpLib(self.handler, instrument=stats)
+        for path in ["/services/search/jobs/1234.5/results",
+                     "/servicesNS/admin/search/search/jobs/scheduler__admin_abc/results",
+                     "/services/search/jobs/1234.5", "/services/search/jobs",
+                     "/services/search/jobs/export", "/services/apps/local/_new",
+                     "/services/configs/conf-props/mysourcetype",
+                     "/services/properties/props/mysourcetype/SHOULD_LINEMERGE"]:
+            http.get("https://localhost:8089" + path).body.read()
+        summary = dict((e.path, e.count) for e in stats.summary())
+        self.assertEqual(summary, {
+            "search/jobs/{sid}/results": 2,
+            "search/jobs/{sid}": 1,
+            "search/jobs": 1,
+            "search/jobs/export": 1,
+            "apps/local/_new": 1,
+            "configs/conf-props/{name}": 1,
+            "properties/{file}/{stanza}/{key}": 1})
+
+    def test_request_stats_key(self):
+        stats = binding.RequestStats(key=lambda path: path.split("/")[-1])
+        http = binding.HttpLib(self.handler, instrument=stats)
+        for path in ["/services/apps/local", "/servicesNS/admin/search/data/indexes"]:
+            http.get("https://localhost:8089" + path).body.read()
+        self.assertEqual(sorted(e.path for e in stats.summary()), ["indexes", "local"])
+
 class TestNamespace(unittest.TestCase):
     def test_namespace(self):
         tests = [
@@ -210,6 +210,33 @@ class CollectionTestCase(testlib.SDKTestCase):
                              msg='on %s (expected: %s, found: %s)' % \
                                  (coll_name, expected, found))
 
+    def test_prefetched_iteration(self):
+        for coll_name in collections:
+            coll = getattr(self.service, coll_name)
+            expected = [ent.name for ent in coll.list()]
+            if len(expected) == 0:
+                logging.debug("No entities in collection %s; skipping test.", coll_name)
+            pagesize = max(int(len(expected)/5.0), 1)
+            found = [ent.name for ent in coll.iter(pagesize=pagesize, prefetch=3)]
+            self.assertEqual(expected, found,
+                             msg='on %s (expected: %s, found: %s)' % \
+                                 (coll_name, expected, found))
+
+    def test_json_output_mode(self):
+        service = client.connect(output_mode="json", **self.opts.kwargs)
+        for coll_name in collections:
+            expected = getattr(self.service, coll_name).list(count=10)
+            found = getattr(service, coll_name).list(count=10)
+            self.assertEqual([ent.name for ent in expected],
+                             [ent.name for ent in found],
+                             msg='on %s' % coll_name)
+            for ent in found:
+                self.assertEqual(set(ent.access.keys()) & expected_access_keys,
+                                 expected_access_keys, msg='on %s' % coll_name)
+                self.assertEqual(set(ent.fields.keys()), expected_fields_keys,
+                                 msg='on %s' % coll_name)
+                ent.refresh()
+
     def test_paging(self):
         for coll_name in collections:
             coll = getattr(self.service, coll_name)
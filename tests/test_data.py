@@ -16,11 +16,12 @@
 
 import sys
 from os import path
-import xml.etree.ElementTree as et
+from StringIO import StringIO
 
 import testlib
 
 import splunklib.data as data
+import splunklib.etree as etree
 
 class DataTestCase(testlib.SDKTestCase):
     def test_elems(self):
@@ -114,9 +115,41 @@ class DataTestCase(testlib.SDKTestCase):
         self.assertEqual(result.feed.entry.content.os_name, 'Darwin')
         self.assertEqual(result.feed.entry.content.os_version, '10.8.0')
 
+    def test_iterload(self):
+        entry = "{http://www.w3.org/2005/Atom}entry"
+        testpath = path.dirname(path.abspath(__file__))
+        for name in ["data/services.xml", "data/services.server.info.xml"]:
+            fh = open(path.join(testpath, name), 'r')
+            entries = data.load(fh.read()).feed.entry
+            if not isinstance(entries, list): entries = [entries]
+            fh.seek(0)
+            self.assertEqual(list(data.iterload(fh, entry)), entries)
+
+        # A single entry at the top level, as search/jobs/<sid> returns.
+        text = '<entry xmlns="http://www.w3.org/2005/Atom"><title>a</title></entry>'
+        self.assertEqual(list(data.iterload(StringIO(text), entry)),
+                         [{'title': 'a'}])
+        # Entries nested below the children of the root are not loaded.
+        text = '<feed xmlns="http://www.w3.org/2005/Atom"><x><entry/></x></feed>'
+        self.assertEqual(list(data.iterload(StringIO(text), entry)), [])
+        self.assertEqual(list(data.iterload(StringIO(""), entry)), [])
+        self.assertRaises(etree.ParseError, list,
+                          data.iterload(StringIO("<feed><entry>"), entry))
+
+    def test_iterload_defer(self):
+        entry = "{http://www.w3.org/2005/Atom}entry"
+        content = "{http://www.w3.org/2005/Atom}content"
+        testpath = path.dirname(path.abspath(__file__))
+        text = open(path.join(testpath, "data/services.server.info.xml")).read()
+        expected = data.load(text).feed.entry
+        found, = data.iterload(StringIO(text), entry, defer=[content])
+        self.assertTrue(isinstance(found.content, data.Deferred))
+        self.assertEqual(found.title, expected.title)
+        self.assertEqual(found.content.load(), expected.content)
+
     def test_invalid(self):
         if sys.version_info[1] >= 7:
-            self.assertRaises(et.ParseError, data.load, "<dict</dict>")
+            self.assertRaises(etree.ParseError, data.load, "<dict</dict>")
         else:
             from xml.parsers.expat import ExpatError
             self.assertRaises(ExpatError, data.load, "<dict</dict>")
@@ -229,6 +262,44 @@ class DataTestCase(testlib.SDKTestCase):
         self.assertEqual(result,
         {'build': '101089', 'cpu_arch': 'i386', 'isFree': '0'})
 
+    def test_interned_names(self):
+        text = '<a><b x="1"><dict><key name="can_write">1</key></dict></b>' \
+               '<b x="2"><dict><key name="can_write">0</key></dict></b></a>'
+        first, second = data.load(text).a.b
+        for key in ['x', 'can_write']:
+            self.assertTrue([k for k in first if k == key][0] is
+                            [k for k in second if k == key][0])
+        self.assertTrue(data.intern_name(u'can_write') is 'can_write')
+        self.assertFalse(hasattr(data.record(), '__dict__'))
+
+    def test_backends(self):
+        entry = "{http://www.w3.org/2005/Atom}entry"
+        testpath = path.dirname(path.abspath(__file__))
+        texts = [open(path.join(testpath, name), 'r').read()
+                 for name in ["data/services.xml", "data/services.server.info.xml"]]
+        texts.append(u"<a b='\u00e9'><!-- c --><d>\u00e9</d><d/></a>")
+        expected = [data.load(text) for text in texts]
+        active = etree.backend
+        self.assertTrue(active in etree.available())
+        try:
+            for name in etree.available():
+                self.assertEqual(etree.use(name), name)
+                self.assertEqual([data.load(text) for text in texts], expected)
+                self.assertEqual(list(data.iterload(StringIO(texts[0]), entry)),
+                                 expected[0].feed.entry)
+                self.assertRaises(etree.ParseError, data.load, "<dict</dict>")
+        finally:
+            etree.use(active)
+        self.assertRaises(ValueError, etree.use, "expat")
+
+    def test_parse_error_without_parse_error_class(self):
+        # Before Python 2.7, ElementTree has no ParseError, and malformed
+        # XML raises ExpatError.
+        from xml.parsers.expat import ExpatError
+        class OldElementTree(object):
+            pass
+        self.assertEqual(etree._ElementTree(OldElementTree()).ParseError, ExpatError)
+
     def test_record(self):
         d = data.record()
         d.update({'foo': 5,
@@ -126,6 +126,22 @@ class TestRead(testlib.SDKTestCase):
             for item in inputs.list(kind, count=3):
                 self.assertEqual(item.kind, kind)
 
+    def test_kinds_are_reused(self):
+        kinds = self.service.inputs.kinds
+        found = self.service._input_kinds_cache
+        self.assertEqual(self.service.inputs.kinds, kinds)
+        self.assertTrue(self.service._input_kinds_cache is found)
+        self.assertEqual(self.service.inputs.kindpath('tcp'), 'tcp/raw')
+        refreshed = self.service.inputs.refresh_kinds()
+        self.assertFalse(refreshed is found)
+        self.assertEqual(refreshed.kinds, kinds)
+
+    def test_lookup_workers(self):
+        inputs = self.service.inputs
+        expected = [(x.kind, x.name) for x in inputs.list()]
+        inputs.lookup_workers = 1
+        self.assertEqual([(x.kind, x.name) for x in inputs.list()], expected)
+
     def test_inputs_list_on_one_kind(self):
         self.service.inputs.list('monitor')
 
@@ -14,7 +14,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from StringIO import StringIO
+import re
 from time import sleep
+import urlparse
 import testlib
 
 try:
@@ -25,8 +28,6 @@ except ImportError:
 import splunklib.client as client
 import splunklib.results as results
 
-from splunklib.binding import _log_duration
-
 
 class TestUtilities(testlib.SDKTestCase):
     def test_service_search(self):
@@ -93,6 +94,15 @@ class TestUtilities(testlib.SDKTestCase):
                 # Normal events are returned as dicts
                 pass #print result
         assert rr.is_preview == False
+
+    def test_results_after_wait(self):
+        job = self.service.jobs.create("search * | head 5")
+        self.assertTrue(job.wait(timeout=120) is job)
+        self.assertEqual(job['isDone'], '1')
+        rr = results.ResultsReader(job.results())
+        rows = [result for result in rr if isinstance(result, dict)]
+        self.assertEqual(len(rows), int(job['resultCount']))
+        assert rr.is_preview == False
     
     def test_preview_docstring_sample(self):
         import splunklib.client as client
@@ -268,7 +278,42 @@ class TestJob(testlib.SDKTestCase):
         super(TestJob, self).tearDown()
         self.job.cancel()
 
-    @_log_duration
+    def test_results_parallel(self):
+        job = self.service.jobs.create("search index=_internal | head 25",
+                                       exec_mode="blocking")
+        try:
+            expected = [row for row in results.ResultsReader(job.results(count=0))
+                        if isinstance(row, dict)]
+            found = list(job.results_parallel(chunk=4, workers=3))
+            self.assertEqual(found, expected)
+            found = list(job.results_parallel(fields=["_raw"], chunk=10,
+                                              ordered=False))
+            self.assertEqual(sorted(row["_raw"] for row in found),
+                             sorted(row["_raw"] for row in expected))
+        finally:
+            job.cancel()
+
+    def test_wait(self):
+        progress = []
+        job = self.job.wait(progress_callback=lambda job, p: progress.append(p))
+        self.assertTrue(job is self.job)
+        self.assertEqual(self.job['isDone'], '1')
+        self.assertEqual(progress[-1], 1.0)
+        self.assertEqual(progress, sorted(progress))
+
+    def test_wait_all(self):
+        jobs = [self.service.jobs.create("search index=_internal | head %d" % n)
+                for n in range(1, 4)]
+        try:
+            done = self.service.jobs.wait_all([self.job] + jobs, timeout=120)
+            self.assertEqual([job.sid for job in done],
+                             [job.sid for job in [self.job] + jobs])
+            for job in done:
+                self.assertEqual(job['isDone'], '1')
+        finally:
+            for job in jobs:
+                job.cancel()
+
     def test_get_preview_and_events(self):
         self.assertEventuallyTrue(self.job.is_done)
         self.assertLessEqual(int(self.job['eventCount']), 3)
@@ -344,6 +389,103 @@ class TestJob(testlib.SDKTestCase):
         self.assertGreater(int(self.job['ttl']), old_ttl)
 
 
+class TestPollDelay(unittest.TestCase):
+    def test_poll_delay(self):
+        # Half of the time the job still needs
+        self.assertEqual(client._poll_delay(
+            {'doneProgress': '0.5', 'runDuration': '2'}, 0, 5), 1)
+        self.assertEqual(client._poll_delay(
+            {'doneProgress': '0.1', 'runDuration': '2'}, 0, 5), 5)
+        self.assertEqual(client._poll_delay(
+            {'doneProgress': '0.99', 'runDuration': '1'}, 0, 5),
+            client.MIN_POLL_INTERVAL)
+        # Without progress, the delay grows from the shortest one
+        self.assertEqual(client._poll_delay({}, 0, 5), client.MIN_POLL_INTERVAL)
+        self.assertEqual(client._poll_delay({'doneProgress': '0'}, 2, 5), 3)
+        self.assertEqual(client._job_progress({'isDone': '1'}), 1.0)
+
+
+class TestWaitAll(unittest.TestCase):
+    # A handler that fakes splunkd with the jobs in self.progress, each of
+    # which is done once it has been polled as many times as its value.
+    # Listings that ask for some fields only leave out resultCount.
+    entry = """<entry xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">
+      <title>search *</title>
+      <link href="/services/search/jobs/%(sid)s" rel="alternate"/>
+      <content type="text/xml"><s:dict>
+        <s:key name="sid">%(sid)s</s:key>
+        <s:key name="isDone">%(isDone)s</s:key>
+        <s:key name="doneProgress">%(doneProgress)s</s:key>
+        <s:key name="runDuration">0.01</s:key>%(more)s
+      </s:dict></content>
+    </entry>"""
+
+    def setUp(self):
+        self.progress = {"a": 1, "b": 3}
+        self.polls = {}
+        self.requests = []
+
+    def handler(self, url, message, **kwargs):
+        self.requests.append(url)
+        path, query = url.split("?", 1)
+        path = path.split("/services/", 1)[1].rstrip("/")
+        query = urlparse.parse_qs(query)
+        polled = 'f' in query
+        sids = re.findall(r'sid="([^"]*)"', query['search'][0])
+        entries = []
+        for sid in sids:
+            if polled:
+                self.polls[sid] = self.polls.get(sid, 0) + 1
+            done = self.polls[sid] >= self.progress[sid]
+            entries.append(self.entry % {
+                'sid': sid, 'isDone': "1" if done else "0",
+                'doneProgress': "1.0" if done else "0.5",
+                'more': "" if polled else '<s:key name="resultCount">3</s:key>'})
+        body = '<feed xmlns="http://www.w3.org/2005/Atom">%s</feed>' % "".join(entries)
+        return {'status': 200, 'reason': "OK", 'headers': [],
+                'body': StringIO(body)}
+
+    def queries(self):
+        return [urlparse.parse_qs(url.split("?", 1)[1]) for url in self.requests]
+
+    def test_one_listing_per_poll(self):
+        service = client.Service(handler=self.handler, token="Splunk x")
+        jobs = [client.Job(service, sid) for sid in ["b", "a"]]
+        self.assertEqual(service.jobs.wait_all(jobs, timeout=5), jobs)
+        self.assertEqual([job['isDone'] for job in jobs], ["1", "1"])
+        # The jobs have their full state once they are done.
+        self.assertEqual([job['resultCount'] for job in jobs], ["3", "3"])
+        self.assertEqual(set(url.split("?")[0].rstrip("/") for url in self.requests),
+                         set(["https://localhost:8089/services/search/jobs"]))
+        # Job b is polled until it is done, and job a only until then.
+        queries = self.queries()
+        self.assertEqual([query['search'] for query in queries],
+                         [['sid="a" OR sid="b"'], ['sid="a"'],
+                          ['sid="b"'], ['sid="b"'], ['sid="b"']])
+        self.assertEqual([query['count'] for query in queries],
+                         [["2"], ["1"], ["1"], ["1"], ["1"]])
+        self.assertEqual([query.get('f') for query in queries],
+                         [client.WAIT_FIELDS, None, client.WAIT_FIELDS,
+                          client.WAIT_FIELDS, None])
+
+    def test_sid_term(self):
+        self.assertEqual(client._sid_term("1476.123_ABC"), 'sid="1476.123_ABC"')
+        self.assertEqual(client._sid_term('a"b\\c'), 'sid="a\\"b\\\\c"')
+
+    def test_many_jobs(self):
+        sids = ["scheduler__admin__search__RMD5%016x_at_1476123456_%d" % (i, i)
+                for i in range(300)]
+        self.progress = dict((sid, 2) for sid in sids)
+        service = client.Service(handler=self.handler, token="Splunk x")
+        jobs = [client.Job(service, sid) for sid in sids]
+        service.jobs.wait_all(jobs, timeout=5)
+        self.assertEqual([job['resultCount'] for job in jobs], ["3"] * 300)
+        chunks = -(-300 // client.WAIT_CHUNK_SIZE)
+        self.assertEqual(len(self.requests), 3 * chunks)
+        for url in self.requests:
+            self.assertTrue(len(url) < 4096, len(url))
+
+
 class TestResultsReader(unittest.TestCase):
     def test_results_reader(self):
         # Run jobs.export("search index=_internal | stats count",
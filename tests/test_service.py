@@ -18,6 +18,8 @@ import testlib
 import logging
 
 import unittest
+from os import path
+from StringIO import StringIO
 
 import splunklib.data as data
 
@@ -195,6 +197,53 @@ class TestTrailing(unittest.TestCase):
             client._trailing(self.template, 'servicesNS/', '/', '/')
         )
 
+class TestJSONErrors(unittest.TestCase):
+    # A handler that fakes splunkd in JSON mode, where no app exists.
+    def handler(self, url, message, **kwargs):
+        body = '{"messages":[{"type":"ERROR","text":"Could not find object id=nope"}]}'
+        return {'status': 404, 'reason': "Not Found",
+                'headers': [("content-type", "application/json; charset=UTF-8")],
+                'body': StringIO(body)}
+
+    def test_missing_entity(self):
+        service = Service(handler=self.handler, token="Splunk x", output_mode="json")
+        self.assertRaises(KeyError, service.apps.__getitem__, "nope")
+        self.assertFalse("nope" in service.apps)
+        try:
+            service.get("apps/local/nope")
+        except HTTPError as e:
+            self.assertEqual(e.status, 404)
+            self.assertEqual(str(e), "HTTP 404 Not Found -- Could not find object id=nope")
+
+    def test_no_entries(self):
+        def handler(url, message, **kwargs):
+            return {'status': 200, 'reason': "OK",
+                    'headers': [("content-type", "application/json; charset=UTF-8")],
+                    'body': StringIO('{"links": {}, "entry": []}')}
+        service = Service(handler=handler, token="Splunk x", output_mode="json")
+        self.assertRaises(ValueError, client.Entity, service, "apps/local/gone")
+
+class TestEntityState(unittest.TestCase):
+    def test_state_is_copied_in_full(self):
+        entry = "{http://www.w3.org/2005/Atom}entry"
+        content = "{http://www.w3.org/2005/Atom}content"
+        testpath = path.dirname(path.abspath(__file__))
+        text = open(path.join(testpath, "data/services.server.info.xml")).read()
+        found, = data.iterload(StringIO(text), entry, defer=[content])
+        entity = client.Entity(Service(token="Splunk x"), "server/info",
+                               state=client._parse_atom_entry(found))
+        self.assertEqual(entity.name, "server-info")
+        # Reading the name does not parse the content.
+        self.assertTrue(entity._state._entry_content is not None)
+        keys = set(["title", "links", "access", "fields", "content"])
+        self.assertEqual(set(dict(entity.state)), keys)
+        merged = {}
+        merged.update(entity.state)
+        self.assertEqual(set(merged), keys)
+        self.assertEqual(set((lambda **state: state)(**entity.state)), keys)
+        self.assertEqual(set(data.record(entity.state)), keys)
+        self.assertEqual(dict(entity.state)["content"].os_name, "Darwin")
+
 class TestEntityNamespacing(testlib.SDKTestCase):
     def test_proper_namespace_with_arguments(self):
         entity = self.service.apps['search']